@@ -0,0 +1,109 @@
+import threading
+import numpy as np
+import pandas as pd
+
+BATCH = 200               # run_screener's fixed batch size
+BYTES_PER_BAR = 48        # 6 float64 fields per ticker-bar in a wide frame
+COPIES = 2                # a batch's bars are about twice in memory while filtered
+SESSION_BARS = 390        # regular-session minutes
+PREPOST_BARS = 960        # 04:00 → 20:00
+
+
+def expected_bars(interval, start, end, prepost=False) -> int:
+    """
+    Bars one ticker should have between start and end: sessions × bars per
+    session (1d = one per session).
+    """
+    sessions = max(1, int(np.busday_count(pd.Timestamp(start).date(), pd.Timestamp(end).date())) + 1)
+    if interval == "1d":
+        return sessions
+    minutes = float(interval.rstrip("m"))
+    return int(sessions * (PREPOST_BARS if prepost else SESSION_BARS) / minutes)
+
+
+def bars_size(bars) -> tuple:
+    """
+    (rows, bytes) of a batch's bars, wide frames or compact.CompactBars.
+    """
+    rows = nbytes = 0
+    for v in bars.values():
+        if isinstance(v, pd.DataFrame):
+            rows += len(v)
+            nbytes += int(v.memory_usage(index=True, deep=False).sum())
+        elif hasattr(v, "nbytes"):
+            rows += v.n_rows
+            nbytes += v.nbytes()
+    return rows, nbytes
+
+
+class AdaptiveBatcher:
+    """
+    Picks run_screener's batch sizes instead of a fixed 200 tickers.
+
+        batcher = AdaptiveBatcher(max_memory=512 * 2**20)
+        run_screener(..., batcher=batcher)
+
+      • max_memory:     bytes of bars allowed in flight at once (counting
+                        COPIES per batch for filtering); each batch
+                        gets max_memory / (scheduler.max_workers + 1), the
+                        batches downloading plus the one being computed
+      • target_seconds: how long one batch download should take; small
+                        daily batches grow until they're worth a round-trip
+      • min_size / max_size: bounds for a batch's tickers
+
+    The first batch is sized from the interval and window length (see
+    expected_bars). After each download, observe() folds its latency and
+    bytes per ticker into running averages and the next batches are sized
+    from those. Batches already handed to the scheduler don't change, so the
+    sizes settle after max_workers batches.
+
+    Intraday metrics use each batch's union of bar stamps, so a ticker with
+    missing minutes can come out slightly different than in a fixed-200 run.
+    """
+
+    def __init__(self, max_memory=512 * 2**20, target_seconds=5.0, min_size=25, max_size=2000, smoothing=0.5):
+        self.max_memory = max_memory
+        self.target_seconds = target_seconds
+        self.min_size = min_size
+        self.max_size = max_size
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self.workers = 1
+        self.bytes_per_ticker = float(BYTES_PER_BAR * COPIES)
+        self.seconds_per_ticker = None
+        self.history = []
+
+    def reset(self, interval, start, end, prepost=False, workers=1):
+        """
+        Start a run: prior bytes per ticker from the window, no latency yet.
+        """
+        with self._lock:
+            self.workers = max(1, workers)
+            self.bytes_per_ticker = float(expected_bars(interval, start, end, prepost) * BYTES_PER_BAR * COPIES)
+            self.seconds_per_ticker = None
+            self.history = []   # (tickers, seconds, rows, bytes) per observed batch
+
+    def observe(self, tickers, seconds, rows, nbytes):
+        """
+        One finished batch download: its ticker count, seconds, rows and bytes.
+        """
+        if tickers <= 0:
+            return
+        a = self.smoothing
+        with self._lock:
+            self.history.append((tickers, seconds, rows, nbytes))
+            if nbytes:
+                self.bytes_per_ticker = a * COPIES * nbytes / tickers + (1 - a) * self.bytes_per_ticker
+            per = seconds / tickers
+            self.seconds_per_ticker = per if self.seconds_per_ticker is None else a * per + (1 - a) * self.seconds_per_ticker
+
+    def size(self) -> int:
+        """
+        Tickers in the next batch.
+        """
+        with self._lock:
+            budget = self.max_memory / (self.workers + 1)
+            size = budget / max(self.bytes_per_ticker, 1.0)
+            if self.seconds_per_ticker:
+                size = min(size, self.target_seconds / self.seconds_per_ticker)
+        return int(min(self.max_size, max(self.min_size, size)))
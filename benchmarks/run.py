@@ -0,0 +1,347 @@
+"""
+Offline benchmark for the screener hot paths.
+
+    python -m benchmarks.run --tickers 500 --days 5 --interval 1m
+    python -m benchmarks.run --update-baseline      # after an intended change
+    python -m benchmarks.run --update-baseline --stages daily_store   # re-record one stage
+
+Every stage runs on SyntheticProvider bars, is timed (best of --repeat) and
+then run once more under tracemalloc for its peak memory. Results go to
+--out as JSON and are compared against the stored baseline for the same
+config; the exit code is 1 if any stage got slower than --threshold x or
+hungrier than --mem-threshold x its baseline (and by more than --min-seconds
+/ --min-mb, so sub-millisecond stages don't flap on timer noise), or if a
+faster path (the daily store) no longer returns the same table as the one
+it replaces.
+"""
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import SyntheticProvider, make_tickers
+from screener import run_screener, slice_window, compute_metrics, compute_metrics_many, baseline_vector
+from scheduler import FetchScheduler
+from daily_store import DailyStore
+from filters.momentum import momentum_screener
+from filters.volume_spike import volume_spike_screener
+from window_index import WindowIndex
+from parallel import compute_metrics_parallel
+from store import BarStore
+from window_grid import run_window_grid
+from filters.pipeline import Panel, Momentum, VolumeSpike, screen
+from table_view import apply_filters, style_results, RankedResults, column_formats, result_page
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_OUT = os.path.join(HERE, "results.json")
+
+
+def parse_args(argv=None):
+    parse = argparse.ArgumentParser(description="Benchmark the screener hot paths offline")
+    parse.add_argument("--tickers", type=int, default=300, help="Number of synthetic tickers")
+    parse.add_argument("--days", type=int, default=5, help="Trading days in the screened window")
+    parse.add_argument("--interval", default="1m", choices=["1m", "2m"], help="Intraday bar size")
+    parse.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parse.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is kept)")
+    parse.add_argument("--stages", default="", help="Comma-separated subset of stages to run")
+    parse.add_argument("--out", default=DEFAULT_OUT, help="Where to write the results JSON")
+    parse.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parse.add_argument("--threshold", type=float, default=1.5, help="Allowed time ratio vs baseline")
+    parse.add_argument("--mem-threshold", type=float, default=1.25, help="Allowed peak-memory ratio vs baseline")
+    parse.add_argument("--min-seconds", type=float, default=0.02,
+                       help="Time increases below this many seconds never count as regressions")
+    parse.add_argument("--min-mb", type=float, default=0.25,
+                       help="Peak-memory increases below this many MB never count as regressions")
+    parse.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    return parse.parse_args(argv)
+
+
+def config_key(args) -> str:
+    return f"{args.tickers}t-{args.days}d-{args.interval}-s{args.seed}"
+
+
+# ─── STAGES ──────────────────────────────────────────────────────────────────
+def build_stages(args):
+    """
+    Returns ({name: zero-arg callable}, {name: check}, provider). Shared
+    inputs are prepared here, outside the timed region; a check returns
+    None when it holds (e.g. a fast path's table equals the reference
+    one), else what is wrong.
+    """
+    provider = SyntheticProvider(n_days=args.days, seed=args.seed)
+    tickers = make_tickers(args.tickers)
+    first, last = provider.window
+    start_intra = pd.Timestamp(f"{first} 10:00")
+    end_intra = pd.Timestamp(f"{last} 15:00")
+    start_daily = pd.Timestamp(f"{first} 16:00")
+    end_daily = pd.Timestamp(f"{last} 16:00")
+
+    # warm the generator's memo so stages only pay for slicing
+    provider.download(tickers, start_intra.date(), end_intra, args.interval, True)
+    df_min = provider.download(tickers, start_intra.date(), end_intra, args.interval, False)
+    df_bl = provider.download(tickers, provider.days[0].date(), first, "1d", False)
+    df_day = provider.download(tickers, first, last + pd.Timedelta(days=1), "1d", False)
+    bvec = baseline_vector(df_bl, tickers)
+    slices = {t: slice_window(df_min, t, start_intra.tz_localize("America/New_York"),
+                              end_intra.tz_localize("America/New_York")) for t in tickers}
+    daily_frames = {t: df_day[t].dropna(how="all") for t in tickers if t in df_day.columns}
+
+    def screener(start, end, interval, compact=False, sessions=False, daily_store=None):
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return run_screener(tickers, interval, start, end, (end - start).days, True,
+                                    provider=provider, scheduler=FetchScheduler(rate=None), compact=compact,
+                                    sessions=sessions, daily_store=daily_store)
+        return run
+
+    results = screener(start_intra, end_intra, args.interval)()
+
+    def window_grid():
+        # 15m / 1h / today / 5d / 20d in one pass, vs one run_screener per window
+        run_window_grid(tickers, end_intra, interval=args.interval, provider=provider,
+                        scheduler=FetchScheduler(rate=None))
+
+    def slicing():
+        s = start_intra.tz_localize("America/New_York")
+        e = end_intra.tz_localize("America/New_York")
+        for t in tickers:
+            slice_window(df_min, t, s, e)
+
+    def metrics_loop():
+        for t in tickers:
+            compute_metrics(slices[t], df_bl[t] if t in df_bl.columns else pd.DataFrame())
+
+    def metrics_parallel():
+        # the metrics_loop work sharded over every core through shared memory
+        compute_metrics_parallel(slices, bvec, workers=os.cpu_count())
+
+    def metrics_batch():
+        compute_metrics_many(slices, bvec)
+
+    index = WindowIndex(df_min)
+
+    def window_queries():
+        # the same loaded bars re-sliced at 20 start/end times
+        stamps = df_min.index
+        for k in range(1, 21):
+            index.metrics(stamps[len(stamps) * k // 60], stamps[-(len(stamps) * k // 60) - 1], bvec)
+
+    store_root = tempfile.mkdtemp(prefix="bench_store_")
+    atexit.register(shutil.rmtree, store_root, True)
+    daily_store = DailyStore(os.path.join(store_root, "daily.sqlite"))
+    atexit.register(daily_store.close)
+    daily_store.update(tickers, last, provider=provider, scheduler=FetchScheduler(rate=None))
+    BarStore.write(store_root, df_min, args.interval)
+
+    def bar_store():
+        # cold open of the mapped store, then the slice_window stage over its views
+        store = BarStore.open(store_root, args.interval)
+        for t in tickers:
+            slice_window(store, t, start_intra, end_intra)
+
+    def filters():
+        for df in daily_frames.values():
+            momentum_screener(df, 2.0)
+            volume_spike_screener(df, 50.0)
+
+    def filter_pipeline():
+        screen(Panel.from_frames(daily_frames), Momentum(2.0) & VolumeSpike(50.0))
+
+    ranked = RankedResults(results)
+
+    def ranked_filters():
+        # "Apply filters" clicks against precomputed rank orders
+        for k, metric in enumerate(ranked.orders):
+            ranked.filter((-20.0 + k, 20.0 - k), 0, 0, 0.0, 0.0, metric, 50)
+
+    def dashboard_view():
+        f = apply_filters(results, (-20.0, 20.0), 0, 0, 0.0, 0.0, "PC (%)", len(results))
+        style_results(f).to_html()
+
+    def dashboard_page():
+        # what the dashboard renders now: one numeric page plus column formats
+        f = ranked.filter((-20.0, 20.0), 0, 0, 0.0, 0.0, "PC (%)", len(results))
+        column_formats(f)
+        result_page(f, 2)[0].to_numpy()
+
+    stages = {
+        "run_screener_intraday": screener(start_intra, end_intra, args.interval),
+        "run_screener_compact":  screener(start_intra, end_intra, args.interval, compact=True),
+        "run_screener_daily":    screener(start_daily, end_daily, "1d"),
+        "daily_store":           screener(start_daily, end_daily, "1d", daily_store=daily_store),
+        "run_screener_sessions": screener(start_intra, end_intra, args.interval, sessions=True),
+        "window_grid":           window_grid,
+        "slice_window":          slicing,
+        "compute_metrics":       metrics_loop,
+        "compute_metrics_parallel": metrics_parallel,
+        "compute_metrics_many":  metrics_batch,
+        "window_index":          window_queries,
+        "bar_store":             bar_store,
+        "filters":               filters,
+        "filter_pipeline":       filter_pipeline,
+        "ranked_filters":        ranked_filters,
+        "dashboard_view":        dashboard_view,
+        "dashboard_page":        dashboard_page,
+    }
+
+    def same_table(fast, reference, used=lambda: True):
+        def check():
+            if not used():
+                return "the fast path wasn't taken"
+            got, want = fast(), reference()
+            if got.equals(want):
+                return None
+            diff = got.compare(want) if got.shape == want.shape and got.columns.equals(want.columns) else None
+            return f"{got.shape} vs {want.shape}" if diff is None else f"{len(diff)} row(s) differ, first:\n{diff.head()}"
+        return check
+
+    def window_bars():
+        # an N-minute grid window holds the N / bar-size bars before end_intra;
+        # dash class shares are left out (the grid, like run_screener, reads them as BRK.B)
+        plain = [t for t in tickers if "-" not in t]
+        grid = run_window_grid(plain, end_intra, ("15m", "1h"), interval=args.interval,
+                               provider=provider, scheduler=FetchScheduler(rate=None)).set_index("Ticker")
+        wall = df_min.index.tz_localize(None) if df_min.index.tz is not None else df_min.index
+        vol = df_min.xs("Volume", axis=1, level=1)
+        for w, minutes in (("15m", 15), ("1h", 60)):
+            inside = (wall >= end_intra - pd.Timedelta(minutes=minutes)) & (wall < end_intra)
+            want = minutes // int(args.interval.rstrip("m"))
+            if inside.sum() != want:
+                return f"{w}: {inside.sum()} bars before {end_intra}, want {want}"
+            total = vol[inside].sum().astype("int64").reindex(grid.index)
+            bad = grid[f"Total Vol {w}"].to_numpy() != total.to_numpy()
+            if bad.any():
+                return f"{w}: Total Vol differs from the last {want} bars for {bad.sum()} ticker(s)"
+        return None
+
+    checks = {
+        "daily_store": same_table(stages["daily_store"], stages["run_screener_daily"],
+                                  lambda: daily_store.serves(tickers, start_daily, end_daily)),
+        "window_grid": window_bars,
+    }
+    if args.stages:
+        wanted = [s.strip() for s in args.stages.split(",") if s.strip()]
+        stages = {k: v for k, v in stages.items() if k in wanted}
+        checks = {k: v for k, v in checks.items() if k in wanted}
+    return stages, checks, provider
+
+
+def measure(fn, repeat):
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(best, 4), "peak_mb": round(peak / 2**20, 2)}
+
+
+# ─── BASELINE ────────────────────────────────────────────────────────────────
+def compare(results, baseline, threshold, mem_threshold, min_seconds=0.0, min_mb=0.0):
+    """
+    List of human-readable regressions of `results` against `baseline`
+    stages: over the ratio and over the absolute floor.
+    """
+    problems = []
+    for name, cur in results.items():
+        ref = baseline.get(name)
+        if not ref:
+            continue
+        if cur["seconds"] > ref["seconds"] * threshold and cur["seconds"] - ref["seconds"] > min_seconds:
+            problems.append(f"{name}: {cur['seconds']:.3f}s vs baseline {ref['seconds']:.3f}s")
+        if cur["peak_mb"] > ref["peak_mb"] * mem_threshold and cur["peak_mb"] - ref["peak_mb"] > min_mb:
+            problems.append(f"{name}: {cur['peak_mb']:.1f}MB peak vs baseline {ref['peak_mb']:.1f}MB")
+    return problems
+
+
+def moved(name, ref, cur) -> str:
+    """
+    One line on how a re-recorded stage moved against its old baseline.
+    """
+    if not ref:
+        return f"{name}: new, {cur['seconds']:.4f}s {cur['peak_mb']:.2f}MB"
+    pct = lambda a, b: f"{(b / a - 1) * 100:+.0f}%" if a else "n/a"
+    return (f"{name}: {ref['seconds']:.4f}s -> {cur['seconds']:.4f}s ({pct(ref['seconds'], cur['seconds'])}), "
+            f"{ref['peak_mb']:.2f}MB -> {cur['peak_mb']:.2f}MB ({pct(ref['peak_mb'], cur['peak_mb'])})")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    key = config_key(args)
+
+    t0 = time.perf_counter()
+    stages, checks, _ = build_stages(args)
+    print(f"[setup] synthetic universe {key} in {time.perf_counter() - t0:.2f}s")
+
+    mismatches = []
+    for name, check in checks.items():
+        diff = check()
+        if diff is not None:
+            mismatches.append(name)
+            print(f"[check] {name}: failed: {diff}")
+        else:
+            print(f"[check] {name}: ok")
+
+    results = {}
+    for name, fn in stages.items():
+        results[name] = measure(fn, args.repeat)
+        print(f"{name:<24} {results[name]['seconds']:>9.4f}s  {results[name]['peak_mb']:>9.2f} MB")
+
+    payload = {
+        "config": key,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "stages": results,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(payload, fh, indent=2)
+    print(f"[results] {args.out}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            baselines = json.load(fh)
+
+    if args.update_baseline:
+        # only the stages that ran are replaced; what moved goes in the commit message
+        old = baselines.setdefault(key, {})
+        for name, cur in results.items():
+            print(f"[baseline] {moved(name, old.get(name), cur)}")
+        old.update(results)
+        with open(args.baseline, "w") as fh:
+            json.dump(baselines, fh, indent=2, sort_keys=True)
+        print(f"[baseline] updated {key} in {args.baseline}")
+        return 1 if mismatches else 0
+
+    if key not in baselines:
+        print(f"[baseline] none stored for {key}; run with --update-baseline to record one")
+        return 1 if mismatches else 0
+    problems = compare(results, baselines[key], args.threshold, args.mem_threshold, args.min_seconds, args.min_mb)
+    for p in problems:
+        print(f"[regression] {p}")
+    if not problems:
+        print(f"[baseline] no regressions vs {key}")
+    return 1 if problems or mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import zlib
+import numpy as np
+import pandas as pd
+from datetime import date
+
+from compact import CompactBars
+
+TZ = "America/New_York"
+
+# minutes after midnight (exchange time) for each session
+PRE_OPEN, REG_OPEN, REG_CLOSE, POST_CLOSE = 4 * 60, 9 * 60 + 30, 16 * 60, 20 * 60
+
+
+def make_tickers(n: int) -> list:
+    """
+    Deterministic fake symbols: AAAA, AAAB, ... plus a dash class share every 50th.
+    """
+    out = []
+    for i in range(n):
+        s, k = "", i
+        for _ in range(4):
+            s = chr(ord("A") + k % 26) + s
+            k //= 26
+        out.append(f"{s}-B" if i % 50 == 49 else s)
+    return out
+
+
+class SyntheticProvider:
+    """
+    Offline provider with realistic-looking bars for benchmarks.
+
+      • n_days:           trading days in the calendar, ending at `last_day`
+      • gap_rate:         chance a regular-session bar is missing (illiquid names get more)
+      • halt_rate:        chance a ticker has no bars at all on a given day
+      • extended_density: share of pre/post-market bars that actually trade
+
+    Prices are a random walk per ticker, volume follows a U-shaped intraday
+    profile. Every (ticker, interval, prepost) series is generated once and
+    memoized (daily bars over the whole calendar, minute bars over the window),
+    so download() only slices — timing a screener run measures the screener,
+    not this generator.
+    """
+
+    def __init__(self, n_days=5, last_day=date(2026, 9, 30), seed=0,
+                 gap_rate=0.02, halt_rate=0.005, extended_density=0.35):
+        self.days = pd.bdate_range(end=last_day, periods=n_days + 95)  # + room for the 90d baseline
+        self.n_days = n_days
+        self.seed = seed
+        self.gap_rate = gap_rate
+        self.halt_rate = halt_rate
+        self.extended_density = extended_density
+        self._series = {}
+        self.calls = 0
+
+    @property
+    def window(self):
+        """
+        (first, last) day of the benchmark window, after the baseline padding.
+        """
+        return self.days[-self.n_days].date(), self.days[-1].date()
+
+    def _rng(self, ticker, salt):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), salt])
+
+    def _daily(self, ticker):
+        rng = self._rng(ticker, 1)
+        n = len(self.days)
+        p0 = float(np.exp(rng.uniform(np.log(5), np.log(500))))
+        close = p0 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        open_ = close * np.exp(rng.normal(0, 0.01, n))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, n))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, n))
+        vol = np.round(self._scale(ticker) * 390 * rng.lognormal(0, 0.4, n))
+        df = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close,
+                           "Adj Close": close, "Volume": vol}, index=self.days)
+        df.index.name = "Date"
+        return df[rng.random(n) >= self.halt_rate]
+
+    def _scale(self, ticker):
+        # per-bar average volume: a few mega caps, a long illiquid tail
+        return float(np.exp(self._rng(ticker, 0).normal(8, 1.5)))
+
+    def _intraday(self, ticker, step, prepost):
+        rng = self._rng(ticker, 2 + step)
+        lo, hi = (PRE_OPEN, POST_CLOSE) if prepost else (REG_OPEN, REG_CLOSE)
+        minutes = np.arange(lo, hi, step)
+        reg = (minutes >= REG_OPEN) & (minutes < REG_CLOSE)
+        days = self.days[-self.n_days:]   # minute bars only cover the window
+        n_days, n_bars = len(days), len(minutes)
+
+        # U-shaped volume profile, thin extended hours
+        x = (minutes - REG_OPEN) / (REG_CLOSE - REG_OPEN)
+        profile = np.where(reg, 0.6 + 2.0 * (x - 0.5) ** 2 * 4, 0.05)
+        scale = self._scale(ticker) * step
+        vol = np.round(scale * profile * rng.lognormal(0, 0.8, (n_days, n_bars)))
+
+        daily = self._daily(ticker)
+        opens = daily["Open"].reindex(days).ffill().bfill().to_numpy()
+        steps = rng.normal(0, 0.0008 * np.sqrt(step), (n_days, n_bars))
+        close = opens[:, None] * np.exp(np.cumsum(steps, axis=1))
+        open_ = np.concatenate([opens[:, None], close[:, :-1]], axis=1)
+        wiggle = rng.uniform(0, 0.001, (n_days, n_bars))
+        high = np.maximum(open_, close) * (1 + wiggle)
+        low = np.minimum(open_, close) * (1 - wiggle)
+
+        # gaps: illiquid names miss more bars, extended hours are sparse, halts drop whole days
+        gap = self.gap_rate * (3 if scale < 1_000 else 1)
+        keep = np.where(reg, rng.random((n_days, n_bars)) >= gap,
+                        rng.random((n_days, n_bars)) < self.extended_density)
+        keep &= days.isin(daily.index)[:, None]
+
+        stamps = (days.values[:, None] + minutes[None, :].astype("timedelta64[m]"))[keep]
+        idx = pd.DatetimeIndex(stamps).tz_localize(TZ)
+        idx.name = "Datetime"
+        return pd.DataFrame({"Open": open_[keep], "High": high[keep], "Low": low[keep],
+                             "Close": close[keep], "Adj Close": close[keep],
+                             "Volume": vol[keep]}, index=idx)
+
+    def bars(self, ticker, interval, prepost):
+        key = (ticker, interval, bool(prepost) and interval != "1d")
+        if key not in self._series:
+            if interval == "1d":
+                self._series[key] = self._daily(ticker)
+            else:
+                self._series[key] = self._intraday(ticker, int(interval.rstrip("m")), key[2])
+        return self._series[key]
+
+    def _frames(self, tickers, start, end, interval, prepost):
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        s, e = pd.Timestamp(start), pd.Timestamp(end)
+        frames = {}
+        for t in tickers:
+            df = self.bars(t, interval, prepost)
+            if df.index.tz is not None:
+                lo, hi = s.tz_localize(TZ), e.tz_localize(TZ)
+            else:
+                lo, hi = s, e
+            i, j = df.index.searchsorted(lo), df.index.searchsorted(hi)
+            if j > i:
+                frames[t] = df.iloc[i:j]
+        return frames
+
+    def download(self, tickers, start, end, interval, prepost):
+        self.calls += 1
+        frames = self._frames(tickers, start, end, interval, prepost)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    def download_compact(self, tickers, start, end, interval, prepost):
+        self.calls += 1
+        return CompactBars.from_frames(self._frames(tickers, start, end, interval, prepost))
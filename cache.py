@@ -0,0 +1,315 @@
+import os
+import re
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+
+INTRADAY_INTERVALS = {"1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"}
+TICKER_RE = re.compile(r"^[A-Za-z0-9.\-^=]+$")
+
+
+def check_tickers(tickers) -> list:
+    """
+    The tickers as a list, or ValueError if one isn't a plain symbol
+    (letters, digits and . - ^ =, not only dots): they become directory names.
+    """
+    tickers = list(tickers)
+    bad = [t for t in tickers if not isinstance(t, str) or not TICKER_RE.match(t) or not t.strip(".")]
+    if bad:
+        raise ValueError(f"invalid ticker(s): {', '.join(map(repr, bad[:5]))}")
+    return tickers
+
+
+def _to_ts(x) -> pd.Timestamp:
+    return pd.Timestamp(x)
+
+
+def _trading_days(first: date, last: date) -> list:
+    """
+    Weekdays in [first → last]. Exchange holidays are not known here; they get
+    an empty day file once a download shows them as a gap (see BarCache._store)
+    so they are never asked for again.
+    """
+    return [d.date() for d in pd.bdate_range(first, last)]
+
+
+def _ticker_frame(df: pd.DataFrame, ticker: str, n_requested: int) -> pd.DataFrame:
+    """
+    Pull one ticker out of a yf.download(..., group_by='ticker') result.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if isinstance(df.columns, pd.MultiIndex):
+        top = df.columns.get_level_values(0)
+        for key in (ticker, ticker.upper()):
+            if key in top:
+                return df[key].dropna(how="all")
+        return pd.DataFrame()
+    # flat columns only come back for a single-ticker request
+    return df.dropna(how="all") if n_requested == 1 else pd.DataFrame()
+
+
+class BarCache:
+    """
+    On-disk OHLCV bar cache keyed by (ticker, interval, trading day).
+
+    Each day is one columnar .npz file (int64 UTC index + one array per field)
+    under  root/<interval>[-prepost]/<ticker>/<YYYY-MM-DD>.npz.
+    fetch() serves whatever days are already on disk and only downloads the
+    missing date ranges. Today's bars are never written since the session is
+    still open.
+
+      • max_bytes:             cap on the cache size, least recently used files go first
+      • minute_retention_days: intraday day files older than this are dropped on evict()
+    """
+
+    def __init__(self, root=".bar_cache", max_bytes=2 * 1024**3, minute_retention_days=30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.minute_retention_days = minute_retention_days
+        self.hits = 0
+        self.misses = 0
+        self._evict_lock = threading.Lock()
+
+    # ─── PATHS ───────────────────────────────────────────────────────────────
+    def _namespace(self, interval, prepost):
+        if interval in INTRADAY_INTERVALS and prepost:
+            return f"{interval}-prepost"
+        return interval
+
+    def _path(self, ns, ticker, day):
+        check_tickers([ticker])
+        return os.path.join(self.root, ns, ticker, f"{day.isoformat()}.npz")
+
+    # ─── DAY FILES ───────────────────────────────────────────────────────────
+    def _write_day(self, path, df):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        idx = df.index
+        tz = str(idx.tz) if getattr(idx, "tz", None) is not None else ""
+        if tz:
+            stamps = idx.tz_convert("UTC").tz_localize(None)
+        else:
+            stamps = idx
+        arrays = {f"c_{col}": df[col].to_numpy(dtype="float64") for col in df.columns}
+        # a temp file of its own: two runs may write the same day at once
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.savez(fh, index=np.asarray(stamps, dtype="datetime64[ns]").view("int64"), tz=np.array(tz), **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _read_day(self, path):
+        with np.load(path) as z:
+            stamps = z["index"]
+            if len(stamps) == 0:
+                return pd.DataFrame()
+            tz = str(z["tz"])
+            idx = pd.DatetimeIndex(stamps.view("datetime64[ns]"))
+            if tz:
+                idx = idx.tz_localize("UTC").tz_convert(tz)
+            cols = {k[2:]: z[k] for k in z.files if k.startswith("c_")}
+        os.utime(path)  # LRU bookkeeping for evict()
+        return pd.DataFrame(cols, index=idx)
+
+    # ─── FETCH ───────────────────────────────────────────────────────────────
+    def _day_span(self, start, end):
+        """
+        Trading days touched by a yf-style [start, end) request.
+        """
+        s, e = _to_ts(start), _to_ts(end)
+        last = e.date()
+        if e == e.normalize():  # end given as a date → exclusive
+            last = last - timedelta(days=1)
+        return _trading_days(s.date(), last)
+
+    def fetch(self, tickers, start, end, interval, prepost, download):
+        """
+        Same contract as yf.download(tickers, start, end, interval, group_by='ticker', ...):
+        returns a wide frame with (ticker, field) columns. `download` is called as
+        download(tickers, start, end, interval, prepost) only for missing ranges.
+        """
+        tickers = list(tickers)
+        ns = self._namespace(interval, prepost)
+        today = date.today()
+        days = self._day_span(start, end)
+
+        # 1) which days does each ticker still need?
+        missing = {}
+        for t in tickers:
+            need = tuple(d for d in days if d >= today or not os.path.exists(self._path(ns, t, d)))
+            if need:
+                missing.setdefault(_runs(need), []).append(t)
+
+        # 2) one request per contiguous gap, shared by every ticker with the same gaps
+        fresh = self._pull(ns, missing, interval, prepost, download, today)
+        self.evict()
+
+        # 3) assemble from disk + what we just pulled; a day file evicted by
+        #    a concurrent batch since step 1 is downloaded again, not dropped
+        pulled = {t: {d for runs, group in missing.items() if t in group
+                      for lo, hi in runs for d in _trading_days(lo, hi)} for t in tickers}
+        parts = {t: [p for p in fresh.get(t, []) if not p.empty] for t in tickers}
+        gone = {}
+        for t in tickers:
+            lost = []
+            for d in days:
+                if d in pulled[t] or d >= today:
+                    continue
+                try:
+                    day_df = self._read_day(self._path(ns, t, d))
+                except FileNotFoundError:
+                    lost.append(d)
+                    continue
+                self.hits += 1
+                if not day_df.empty:
+                    parts[t].append(day_df)
+            if lost:
+                gone.setdefault(_runs(tuple(lost)), []).append(t)
+        for t, again in self._pull(ns, gone, interval, prepost, download, today).items():
+            parts[t].extend(p for p in again if not p.empty)
+
+        frames = {}
+        for t in tickers:
+            if parts[t]:
+                tdf = pd.concat(parts[t]).sort_index()
+                frames[t] = tdf[~tdf.index.duplicated(keep="last")]
+
+        if not frames:
+            return pd.DataFrame()
+        wide = pd.concat(frames, axis=1)
+        return _clip(wide, start, end)
+
+    def _pull(self, ns, missing, interval, prepost, download, today) -> dict:
+        """
+        Download {day runs: tickers} gaps and store them; {ticker: [frames]}.
+        """
+        fresh = {}
+        for runs, group in missing.items():
+            for lo, hi in runs:
+                self.misses += len(group)
+                df = download(group, lo, hi + timedelta(days=1), interval, prepost)
+                traded = _traded_days(df)
+                for t in group:
+                    tdf = _ticker_frame(df, t, len(group))
+                    fresh.setdefault(t, []).append(tdf)
+                    self._store(ns, t, tdf, lo, hi, today, traded)
+        return fresh
+
+    def _store(self, ns, ticker, df, lo, hi, today, traded=frozenset()):
+        """
+        Split a freshly downloaded frame into day files. A day in [lo, hi]
+        without bars gets an empty file (so it isn't refetched) only when it
+        is known to be a real non-trading day for the ticker: other tickers
+        of the same request (`traded`) had bars that day, or it's a gap
+        between the ticker's own first and last bar (a holiday). Nothing is
+        stored for a ticker that came back empty; that's as likely a failed
+        or rate-limited download as a ticker without history.
+        """
+        if df.empty:
+            return
+        by_day = {}
+        for d, part in df.groupby(_local_dates(df.index)):
+            by_day[d] = part
+        first, last = min(by_day), max(by_day)
+        for d in _trading_days(lo, hi):
+            if d >= today:
+                continue
+            part = by_day.get(d)
+            if part is None:
+                if d not in traded and not first < d < last:
+                    continue
+                part = df.iloc[0:0]
+            self._write_day(self._path(ns, ticker, d), part)
+
+    # ─── EVICTION ────────────────────────────────────────────────────────────
+    def evict(self):
+        """
+        Drop intraday day files older than minute_retention_days, then the least
+        recently used files until the cache fits in max_bytes.
+        """
+        if not os.path.isdir(self.root):
+            return
+        with self._evict_lock:
+            self._evict()
+
+    def _evict(self):
+        cutoff = (date.today() - timedelta(days=self.minute_retention_days)).isoformat()
+        files = []
+        for ns in os.listdir(self.root):
+            is_minute = ns.split("-")[0] in INTRADAY_INTERVALS
+            ns_dir = os.path.join(self.root, ns)
+            for ticker in os.listdir(ns_dir):
+                t_dir = os.path.join(ns_dir, ticker)
+                for name in os.listdir(t_dir):
+                    path = os.path.join(t_dir, name)
+                    if name.endswith(".tmp"):
+                        continue  # another batch is mid-write
+                    try:
+                        if is_minute and name[:10] < cutoff:
+                            os.remove(path)
+                            continue
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(f[1] for f in files)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+def _runs(days):
+    """
+    Collapse a sorted tuple of days into ((lo, hi), ...) runs of consecutive trading days.
+    """
+    runs = []
+    lo = prev = days[0]
+    for d in days[1:]:
+        if len(_trading_days(prev, d)) > 2:
+            runs.append((lo, prev))
+            lo = d
+        prev = d
+    runs.append((lo, prev))
+    return tuple(runs)
+
+
+def _local_dates(idx):
+    return pd.Index(idx.date)
+
+
+def _traded_days(df) -> set:
+    """
+    Days on which any ticker of a downloaded wide frame has a bar.
+    """
+    if df is None or df.empty:
+        return set()
+    rows = ~np.isnan(df.to_numpy("float64")).all(axis=1)
+    return set(_local_dates(df.index[rows]))
+
+
+def _clip(df, start, end):
+    """
+    Trim the assembled frame back to the exact [start, end) the caller asked for.
+    """
+    s, e = _to_ts(start), _to_ts(end)
+    tz = getattr(df.index, "tz", None)
+    if tz is not None:
+        s = s.tz_localize(tz) if s.tzinfo is None else s.tz_convert(tz)
+        e = e.tz_localize(tz) if e.tzinfo is None else e.tz_convert(tz)
+    return df.loc[(df.index >= s) & (df.index < e)]
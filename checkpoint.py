@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+
+def run_id(tickers, interval, start, end, prepost, source="", compact=False, sessions=False) -> str:
+    """
+    Directory name for one screener run: same tickers, window, bar source
+    and output mode → same id, so a rerun finds the previous attempt's
+    batches and a run in another mode (different columns) doesn't.
+    """
+    modes = [m for m, on in (("compact", compact), ("sessions", sessions)) if on]
+    text = "\n".join([*map(str, tickers), interval, str(start), str(end), str(bool(prepost)), source, *modes])
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class RunCheckpoint:
+    """
+    On-disk progress of one screener run, so a failed or interrupted run
+    resumes from its last finished batch instead of starting over.
+
+        root/<run id>/plan.pkl             the planned daily frames (baseline + window days)
+                      bars-<n>.pkl         batch n's tickers and downloaded bars
+                      batch-<n>.pkl        batch n's tickers and result rows/table
+                      quarantine.json      tickers dropped after failing on their own
+                      done.json            written once every batch is in
+
+    Pass it to run_screener / iter_screener (checkpoint=...). Finished batches
+    are loaded instead of recomputed and the rest of the tickers continue
+    after them (batch sizes may differ with an AdaptiveBatcher), and bars
+    already on disk for the same tickers aren't downloaded again. Every file is written to a .tmp and renamed, like
+    BarCache day files, so a crash never leaves half a checkpoint; a batch
+    file that doesn't load anyway counts as not finished.
+
+    A rerun retries the tickers an earlier attempt quarantined, since most
+    failures are transient: the planned frames are fetched again and the
+    batches from the first one that left a quarantined ticker out are
+    recomputed.
+
+      • keep_bars: keep bars-<n>.pkl after batch n finished (default drops
+                   them, the result is all a resume needs)
+      • compact, sessions: the run_screener flags of the run; they change
+                   its bars and columns, so they are part of the run id and
+                   run_screener refuses a checkpoint made for other ones
+    """
+
+    def __init__(self, root, tickers, interval, start, end, prepost, source="", keep_bars=False,
+                 compact=False, sessions=False):
+        self.path = os.path.join(root, run_id(tickers, interval, start, end, prepost, source, compact, sessions))
+        self.keep_bars = keep_bars
+        self.compact = bool(compact)
+        self.sessions = bool(sessions)
+        os.makedirs(self.path, exist_ok=True)
+        self.quarantined = {}
+        retry = self._read_json("quarantine.json", {})
+        if retry:
+            self._retry(retry)
+
+    # ─── FILES ───────────────────────────────────────────────────────────────
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _write(self, name, obj):
+        tmp = self._file(name) + ".tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._file(name))
+
+    def _read(self, name):
+        try:
+            with open(self._file(name), "rb") as fh:
+                return pickle.load(fh)
+        except Exception:
+            # missing, or cut short / garbled some other way: recomputed
+            return None
+
+    def _read_json(self, name, default):
+        try:
+            with open(self._file(name)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return default
+
+    def _write_json(self, name, obj):
+        tmp = self._file(name) + ".tmp"
+        with open(tmp, "w") as fh:
+            json.dump(obj, fh, indent=1)
+        os.replace(tmp, self._file(name))
+
+    # ─── RUN STATE ───────────────────────────────────────────────────────────
+    def plan_frames(self):
+        return self._read("plan.pkl")
+
+    def save_plan_frames(self, frames):
+        self._write("plan.pkl", frames)
+
+    def bars(self, n, tickers):
+        """
+        Batch n's saved bars, if they were saved for these tickers.
+        """
+        saved = self._read(f"bars-{n:05d}.pkl")
+        return saved[1] if saved is not None and saved[0] == list(tickers) else None
+
+    def save_bars(self, n, tickers, bars):
+        self._write(f"bars-{n:05d}.pkl", (list(tickers), bars))
+
+    def has_batch(self, n) -> bool:
+        return self.batch(n) is not None
+
+    def batch(self, n):
+        """
+        (tickers, rows) of finished batch n, None if it isn't (or its file
+        doesn't load).
+        """
+        return self._read(f"batch-{n:05d}.pkl")
+
+    def save_batch(self, n, tickers, rows):
+        self._write(f"batch-{n:05d}.pkl", (list(tickers), rows))
+        if not self.keep_bars:
+            try:
+                os.remove(self._file(f"bars-{n:05d}.pkl"))
+            except OSError:
+                pass
+
+    def quarantine(self, ticker, error):
+        self.quarantined[ticker] = str(error)[:500]
+        self._write_json("quarantine.json", self.quarantined)
+
+    def _retry(self, quarantined):
+        # drop everything the quarantined tickers were left out of
+        n = 0
+        while True:
+            saved = self.batch(n)
+            if saved is None or set(saved[0]) & set(quarantined):
+                break
+            n += 1
+        for name in os.listdir(self.path):
+            stem, _, ext = name.partition("-")
+            if stem in ("batch", "bars") and ext[:5].isdigit() and int(ext[:5]) >= n:
+                os.remove(self._file(name))
+        for name in ("plan.pkl", "done.json", "quarantine.json"):
+            try:
+                os.remove(self._file(name))
+            except OSError:
+                pass
+
+    def finish(self, n_batches):
+        self._write_json("done.json", {"batches": n_batches, "quarantined": sorted(self.quarantined)})
+
+    @property
+    def done(self) -> bool:
+        return os.path.exists(self._file("done.json"))
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
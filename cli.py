@@ -0,0 +1,207 @@
+"""
+Headless screener for cron and other scheduled runs.
+
+    python cli.py tickers.csv --start "2026-10-16 09:30" --end "2026-10-16 16:00" -o results.parquet
+    python cli.py tickers.csv --start 2026-10-01 --end 2026-10-16 --interval 1d -o daily.csv --workers 8
+    python cli.py tickers.csv --start 2026-10-01 --end 2026-10-16 -o out.csv --run-dir .runs   # resumable
+    python cli.py tickers.csv --start 2026-10-01 --end 2026-10-16 -o daily.csv --daily-store daily_bars.sqlite
+
+The ticker file is the same CSV the dashboard's uploader takes (a `Ticker`
+column). Tickers are split into one shard of whole 200-ticker batches per
+worker process and each shard runs run_screener on its own, so downloads and
+metrics use every core. Results are written as CSV or Parquet (by
+extension), timings go to stderr. With --run-dir every shard checkpoints its
+finished batches there (checkpoint.RunCheckpoint), so rerunning the same
+command after a crash picks up after the last finished batch; tickers that
+kept failing are quarantined and listed instead of failing their shard
+(rerunning retries them); a provider outage fails the shard.
+With --daily-store, daily-only windows the nightly store (daily_store.py)
+covers are read from it instead of downloaded.
+
+Exit codes: 0 ok, 1 a shard failed (the other shards are still written),
+2 bad arguments or input, 3 tickers were quarantined (the rest is written).
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from batching import BATCH, AdaptiveBatcher
+from cache import BarCache
+from checkpoint import RunCheckpoint
+from daily_store import DailyStore
+from profiling import RunProfile
+from providers import LocalProvider
+from scheduler import FetchScheduler
+from screener import run_screener
+
+
+def parse_args(argv=None):
+    parse = argparse.ArgumentParser(description="Run the stock screener without the dashboard")
+    parse.add_argument("tickers", help="CSV file with a 'Ticker' column")
+    parse.add_argument("--start", required=True, help="Window start, e.g. '2026-10-16 09:30' (date only = 16:00)")
+    parse.add_argument("--end", required=True, help="Window end, e.g. '2026-10-16 16:00' (date only = 16:00)")
+    parse.add_argument("--interval", default="auto", help="1m, 2m, 1d or auto (the dashboard's rule)")
+    parse.add_argument("-o", "--out", required=True, help="Output file, .csv or .parquet")
+    parse.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parse.add_argument("--bars-dir", default="", help="Read bars from <dir>/<TICKER>/*.csv instead of yfinance")
+    parse.add_argument("--cache-dir", default=".bar_cache", help="On-disk bar cache ('' to disable)")
+    parse.add_argument("--rate", type=float, default=4.0, help="Provider requests per second, across all workers")
+    parse.add_argument("--retries", type=int, default=2, help="Extra attempts for a failed download, with backoff")
+    parse.add_argument("--run-dir", default="", help="Checkpoint finished batches here and resume from them")
+    parse.add_argument("--max-memory", type=float, default=0,
+                       help="MB of bars in flight across all workers; sizes batches adaptively (0 = 200 tickers)")
+    parse.add_argument("--daily-store", default="",
+                       help="SQLite store from daily_store.py to answer daily-only windows from")
+    parse.add_argument("--no-prepost", action="store_true", help="Leave out pre/post-market minute bars")
+    parse.add_argument("--compact", action="store_true", help="Compact in-memory bars (lower memory)")
+    parse.add_argument("--verbose", action="store_true", help="Keep run_screener's own output")
+    return parse.parse_args(argv)
+
+
+def read_tickers(path) -> list:
+    df = pd.read_csv(path)
+    if "Ticker" not in df.columns:
+        raise ValueError("CSV must contain a 'Ticker' column.")
+    return df["Ticker"].dropna().astype(str).str.strip().loc[lambda s: s != ""].drop_duplicates().tolist()
+
+
+def parse_when(text) -> pd.Timestamp:
+    ts = pd.Timestamp(text)
+    if ":" not in str(text):
+        ts = ts.replace(hour=16, minute=0)  # a bare date means that day's close, like the daily-only dashboard runs
+    return ts
+
+
+def pick_interval(start, end, interval="auto") -> str:
+    if interval != "auto":
+        return interval
+    num_days = (end - start).days
+    if num_days <= 7:
+        return "1m"
+    elif num_days <= 60:
+        return "2m"
+    return "1d"
+
+
+def _run_shard(shard, tickers, interval, start, end, prepost, bars_dir, cache_dir, rate, compact, verbose,
+               retries=2, run_dir="", max_memory=0, daily_store=""):
+    """
+    One worker process: run_screener over its own slice of the universe.
+    """
+    t0 = time.perf_counter()
+    profile = RunProfile()
+    out = io.StringIO()
+    with contextlib.redirect_stdout(sys.stderr if verbose else out):
+        df = run_screener(
+            tickers, interval, start, end, (end - start).days, prepost,
+            cache=BarCache(cache_dir) if cache_dir and not bars_dir else None,
+            provider=LocalProvider(bars_dir) if bars_dir else None,
+            scheduler=FetchScheduler(rate=rate, retries=retries),
+            profile=profile,
+            compact=compact,
+            checkpoint=RunCheckpoint(run_dir, tickers, interval, start, end, prepost, bars_dir,
+                                     compact=compact) if run_dir else None,
+            batcher=AdaptiveBatcher(max_memory) if max_memory else None,
+            daily_store=DailyStore(daily_store) if daily_store else None,
+        )
+    return (shard, df, time.perf_counter() - t0, profile.summary(), profile.meta.get("fetch_plan", {}),
+            profile.meta.get("quarantined", {}))
+
+
+def write_results(df, path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        df.to_parquet(path, index=False)
+    elif ext == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unknown output type '{ext}' (use .csv or .parquet)")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        tickers = read_tickers(args.tickers)
+        start, end = parse_when(args.start), parse_when(args.end)
+        if end < start:
+            raise ValueError("--end is before --start")
+        interval = pick_interval(start, end, args.interval)
+        if os.path.splitext(args.out)[1].lower() not in (".csv", ".parquet"):
+            raise ValueError("--out must end in .csv or .parquet")
+        if args.daily_store and not os.path.exists(args.daily_store):
+            raise ValueError(f"--daily-store {args.daily_store} does not exist (build it with daily_store.py)")
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    if not tickers:
+        print("error: no tickers in the CSV", file=sys.stderr)
+        return 2
+
+    # shards are whole 200-ticker batches, so every batch (and its numbers)
+    # is exactly what a single run_screener call would have made
+    n_batches = -(-len(tickers) // BATCH)
+    per_shard = -(-n_batches // max(1, min(args.workers, n_batches))) * BATCH
+    shards = [tickers[i:i + per_shard] for i in range(0, len(tickers), per_shard)]
+    rate = args.rate / len(shards) if args.rate else None
+    print(f"[screen] {len(tickers)} tickers, {interval}, {start} → {end}, {len(shards)} worker(s)", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    parts, failed, summaries, plans, quarantined = {}, [], [], [], {}
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        futures = {
+            pool.submit(_run_shard, n, shard, interval, start, end, not args.no_prepost,
+                        args.bars_dir, args.cache_dir, rate, args.compact, args.verbose,
+                        args.retries, args.run_dir, args.max_memory * 2**20 / len(shards), args.daily_store): n
+            for n, shard in enumerate(shards)
+        }
+        for fut in as_completed(futures):
+            n = futures[fut]
+            try:
+                _, df, seconds, summary, plan, dropped = fut.result()
+            except Exception:
+                failed.append(n)
+                print(f"[shard {n}] FAILED ({len(shards[n])} tickers)\n{traceback.format_exc()}", file=sys.stderr)
+                continue
+            parts[n] = df
+            summaries.append(summary)
+            plans.append(plan)
+            quarantined.update(dropped)
+            print(f"[shard {n}] {len(shards[n])} tickers → {len(df)} rows in {seconds:.2f}s", file=sys.stderr)
+
+    df = pd.concat([parts[n] for n in sorted(parts)], ignore_index=True) if parts else pd.DataFrame()
+    if summaries:
+        stages = pd.concat(summaries).groupby(level=0, sort=False)[["seconds", "rows", "tickers"]].sum()
+        print("[stages] summed over workers\n" + stages.round(3).to_string(), file=sys.stderr)
+    if plans:
+        saved = pd.DataFrame(plans).sum()
+        print(f"[fetch plan] {saved.get('needs', 0)} daily needs → {saved.get('requests', 0)} requests "
+              f"({saved.get('requests_saved', 0)} saved, {saved.get('bars_saved', 0)} bars saved)", file=sys.stderr)
+
+    for ticker, error in sorted(quarantined.items()):
+        print(f"[quarantine] {ticker}: {error}", file=sys.stderr)
+
+    try:
+        write_results(df, args.out)
+    except (OSError, ImportError, ValueError) as exc:
+        print(f"error: could not write {args.out}: {exc}", file=sys.stderr)
+        return 1
+    print(f"[screen] {len(df)} rows → {args.out} in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+    if failed:
+        print(f"[screen] {len(failed)} of {len(shards)} shard(s) failed: {sorted(failed)}", file=sys.stderr)
+        return 1
+    if quarantined:
+        print(f"[screen] {len(quarantined)} of {len(tickers)} ticker(s) quarantined", file=sys.stderr)
+        return 3
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
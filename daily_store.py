@@ -0,0 +1,408 @@
+"""
+Nightly daily-bar store: daily bars plus rolling aggregates per ticker in one
+SQLite file, so daily-only screens are lookups instead of 90 days of
+downloads.
+
+    python daily_store.py tickers.csv --db daily_bars.sqlite                # nightly, after the close
+    python daily_store.py tickers.csv --db daily_bars.sqlite --bars-dir drops/
+
+e.g. from cron:  30 17 * * 1-5  cd /srv/screener && python daily_store.py tickers.csv
+
+The first run backfills --history-days of bars; later runs only download the
+days after each ticker's last update and append them, computing the new
+rows' aggregates from the tail already in the store. Pass the store to
+run_screener (daily_store=...), cli.py --daily-store or the dashboard
+(SCREENER_DAILY_STORE) and daily-only windows it covers are answered with a
+few index seeks per ticker.
+"""
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, time as dtime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from batching import BATCH
+from cache import _ticker_frame
+from engine import EXCHANGE_TZ
+from providers import LocalProvider, YFinanceProvider
+from scheduler import FetchScheduler
+
+HISTORY_DAYS = 400      # calendar days backfilled for a new ticker
+BASELINE_DAYS = 90      # run_screener's RVol lookback
+TAIL_DAYS = 100         # calendar days of stored bars the new rows' aggregates are computed from
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL, day TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume REAL,
+    seq INTEGER NOT NULL,           -- bar number within the ticker, from 1
+    cum_vol REAL NOT NULL,          -- running volume total (NaN volume as 0)
+    cum_n INTEGER NOT NULL,         -- running count of bars with a volume
+    ret_1d REAL, ret_5d REAL, ret_20d REAL,
+    avg_vol_20d REAL, avg_vol_90d REAL,   -- mean volume over the 20/90 calendar days before `day`
+    PRIMARY KEY (ticker, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tickers (
+    ticker TEXT PRIMARY KEY,
+    since TEXT NOT NULL,            -- history requested from
+    last_day TEXT,                  -- last stored bar
+    checked TEXT NOT NULL           -- downloaded through this day
+);
+"""
+BAR_COLUMNS = ["open", "high", "low", "close", "adj_close", "volume"]
+AGG_COLUMNS = ["seq", "cum_vol", "cum_n", "ret_1d", "ret_5d", "ret_20d", "avg_vol_20d", "avg_vol_90d"]
+
+
+def last_session(day) -> date:
+    """
+    The last weekday on or before `day` (exchange holidays aren't known here).
+    """
+    return np.busday_offset(np.datetime64(pd.Timestamp(day).date()), 0, roll="backward").astype(object)
+
+
+def default_through() -> date:
+    """
+    The last finished session: today once the close's bar is settled, else
+    the weekday before (a still-forming bar would be stored for good).
+    """
+    now = pd.Timestamp.now(tz=EXCHANGE_TZ)
+    today = now.date() if now.time() >= dtime(16, 30) else now.date() - timedelta(days=1)
+    return last_session(today)
+
+
+def _aggregates(rows: pd.DataFrame, prev: pd.DataFrame) -> pd.DataFrame:
+    """
+    AGG_COLUMNS for `rows` (tail already stored + new bars, sorted by ticker,
+    day) continuing each ticker's running totals from `prev` (its stored row
+    just before the new bars).
+    """
+    g = rows.groupby("ticker", sort=False)
+    vol = rows["volume"]
+    out = pd.DataFrame(index=rows.index)
+    out["ret_1d"] = rows["close"] / g["close"].shift(1) - 1
+    out["ret_5d"] = rows["close"] / g["close"].shift(5) - 1
+    out["ret_20d"] = rows["close"] / g["close"].shift(20) - 1
+    for n in (20, 90):
+        roll = (rows.set_index("day").groupby("ticker", sort=False)["volume"]
+                .rolling(f"{n}D", closed="left").mean())
+        out[f"avg_vol_{n}d"] = roll.to_numpy()
+    new = rows["new"].to_numpy(bool)
+    base = prev.reindex(rows["ticker"]).fillna(0)
+    step = pd.DataFrame({"ticker": rows["ticker"], "one": new.astype("int64"),
+                         "v": np.where(new, vol.fillna(0), 0.0), "n": (new & vol.notna()).astype("int64")})
+    cs = step.groupby("ticker", sort=False)[["one", "v", "n"]].cumsum()
+    out["seq"] = base["seq"].to_numpy() + cs["one"].to_numpy()
+    out["cum_vol"] = base["cum_vol"].to_numpy() + cs["v"].to_numpy()
+    out["cum_n"] = base["cum_n"].to_numpy() + cs["n"].to_numpy()
+    return out
+
+
+class DailyStore:
+    """
+    SQLite store of daily bars and per-bar rolling aggregates.
+
+      • bars:    one row per (ticker, day): OHLCV, running seq / volume /
+                 volume-count totals, 1/5/20-bar returns and the mean volume
+                 of the 20 and 90 calendar days before the day
+      • tickers: how far back each ticker was requested and through which
+                 day it was last downloaded. Only a ticker that came back
+                 with bars moves on: yfinance reports a failed or
+                 rate-limited ticker as NaN columns, so an empty one is
+                 asked for again the next night (like BarCache, which
+                 stores nothing for it) and covers() stays False for it
+
+    update() appends only days newer than what is stored. screen() answers a
+    daily-only run_screener window from the running totals (the last bar in
+    the window and before the 90-day baseline's start and end, three index
+    seeks per ticker) plus each batch's first and last window day.
+    """
+
+    def __init__(self, path="daily_bars.sqlite"):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    # ─── NIGHTLY UPDATE ──────────────────────────────────────────────────────
+    def update(self, tickers, through=None, provider=None, cache=None, scheduler=None,
+               history_days=HISTORY_DAYS) -> dict:
+        """
+        Download and append every ticker's bars after its last update, up to
+        and including `through` (default: the last finished session).
+        Returns counts for logging.
+        """
+        from screener import _download
+
+        provider = provider or YFinanceProvider()
+        scheduler = scheduler or FetchScheduler()
+        through = pd.Timestamp(through).date() if through is not None else default_through()
+        tickers = list(dict.fromkeys(tickers))
+        with self._lock:
+            known = {t: (since, checked) for t, since, checked in
+                     self._db.execute("SELECT ticker, since, checked FROM tickers")}
+        # tickers needing the same date range share one request
+        groups = {}
+        for t in tickers:
+            since, checked = known.get(t, (None, None))
+            first = (date.fromisoformat(checked) + timedelta(days=1)) if checked else through - timedelta(days=history_days)
+            if first <= through:
+                groups.setdefault(first, []).append(t)
+
+        new_bars, no_bars = 0, 0
+        for first, group in groups.items():
+            reqs = [group[i:i + BATCH] for i in range(0, len(group), BATCH)]
+
+            def fetch(batch):
+                return _download(provider, batch, first, through + timedelta(days=1), "1d", False, cache, scheduler)
+
+            for batch, df in scheduler.run(reqs, fetch):
+                added, empty = self._append(batch, df, first, through, history_days)
+                new_bars += added
+                no_bars += len(empty)
+        return {"tickers": len(tickers), "requests": sum(-(-len(g) // BATCH) for g in groups.values()),
+                "new_bars": new_bars, "no_bars": no_bars, "through": str(through)}
+
+    def _append(self, batch, df, first, through, history_days) -> tuple:
+        """
+        Store the new bars of one downloaded batch; (bars added, tickers
+        that came back without any).
+        """
+        frames, empty = [], []
+        for t in batch:
+            tdf = _ticker_frame(df, t, len(batch))
+            if tdf.empty:
+                empty.append(t)
+                continue
+            idx = pd.DatetimeIndex(tdf.index)
+            if idx.tz is not None:
+                idx = idx.tz_localize(None)
+            part = pd.DataFrame({
+                "ticker": t, "day": idx.normalize(),
+                **{c: (tdf[f].to_numpy("float64") if f in tdf.columns else np.nan)
+                   for c, f in zip(BAR_COLUMNS, ["Open", "High", "Low", "Close", "Adj Close", "Volume"])},
+            })
+            part = part[(part["day"].dt.date >= first) & (part["day"].dt.date <= through)]
+            frames.append(part.drop_duplicates("day", keep="last"))
+
+        with self._lock, self._db:
+            n = 0
+            if frames:
+                fresh = pd.concat(frames, ignore_index=True)
+                names = list(fresh["ticker"].unique())
+                tail, prev = self._tail(names, fresh["day"].min().date())
+                # only days after what is stored: "update only the new day"
+                last = pd.DatetimeIndex(tail.groupby("ticker")["day"].max().reindex(fresh["ticker"]))
+                fresh = fresh[last.isna() | (fresh["day"].to_numpy() > last)]
+                fresh["new"] = True
+                tail["new"] = False
+                rows = pd.concat([tail, fresh], ignore_index=True).sort_values(["ticker", "day"], kind="stable")
+                rows = rows.reset_index(drop=True).astype({c: "float64" for c in BAR_COLUMNS} | {"new": bool})
+                rows = pd.concat([rows, _aggregates(rows, prev)], axis=1)
+                rows = rows[rows["new"].to_numpy(bool)]
+                rows["day"] = rows["day"].dt.strftime("%Y-%m-%d")
+                cols = ["ticker", "day"] + BAR_COLUMNS + AGG_COLUMNS
+                records = [tuple(None if isinstance(v, float) and np.isnan(v) else v for v in r)
+                           for r in rows[cols].itertuples(index=False, name=None)]
+                self._db.executemany(f"INSERT OR REPLACE INTO bars ({', '.join(cols)}) "
+                                     f"VALUES ({', '.join('?' * len(cols))})", records)
+                n = len(records)
+            since = (through - timedelta(days=history_days)).isoformat()
+            self._db.executemany(
+                "INSERT INTO tickers (ticker, since, last_day, checked) VALUES (?, ?, "
+                "(SELECT MAX(day) FROM bars WHERE ticker = ?), ?) "
+                "ON CONFLICT(ticker) DO UPDATE SET last_day = excluded.last_day, checked = excluded.checked",
+                [(t, since, t, through.isoformat()) for t in batch if t not in empty])
+        return n, empty
+
+    def _tail(self, tickers, first_new):
+        """
+        Stored bars of `tickers` from TAIL_DAYS before first_new (for the
+        rolling aggregates) and each ticker's last stored running totals.
+        """
+        self._want(tickers)
+        cutoff = (first_new - timedelta(days=TAIL_DAYS)).isoformat()
+        tail = pd.read_sql_query(
+            "SELECT b.ticker, b.day, " + ", ".join(f"b.{c}" for c in BAR_COLUMNS) +
+            " FROM bars b JOIN want w ON b.ticker = w.ticker WHERE b.day >= ?", self._db, params=(cutoff,))
+        tail["day"] = pd.to_datetime(tail["day"])
+        prev = pd.read_sql_query(
+            "SELECT b.ticker, b.seq, b.cum_vol, b.cum_n FROM want w JOIN bars b ON b.ticker = w.ticker "
+            "AND b.day = (SELECT MAX(day) FROM bars WHERE ticker = w.ticker)", self._db).set_index("ticker")
+        return tail, prev
+
+    def _want(self, tickers):
+        # callers hold `with self._db`, so the transaction these inserts open
+        # is committed and no reader keeps the nightly writer locked out
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS want (ticker TEXT PRIMARY KEY)")
+        self._db.execute("DELETE FROM want")
+        self._db.executemany("INSERT OR IGNORE INTO want VALUES (?)", [(t,) for t in tickers])
+
+    # ─── LOOKUPS ─────────────────────────────────────────────────────────────
+    def covers(self, tickers, start, end) -> bool:
+        """
+        Whether every ticker was downloaded through `end`'s session and far
+        enough back for the 90-day baseline before `start`.
+        """
+        need_since = (pd.Timestamp(start).normalize() - timedelta(days=BASELINE_DAYS)).date().isoformat()
+        need_checked = last_session(end).isoformat()
+        with self._lock, self._db:
+            self._want(tickers)
+            n_ok, = self._db.execute(
+                "SELECT COUNT(*) FROM want w JOIN tickers t ON t.ticker = w.ticker "
+                "WHERE t.since <= ? AND t.checked >= ?", (need_since, need_checked)).fetchone()
+            n_want, = self._db.execute("SELECT COUNT(*) FROM want").fetchone()
+        return n_want > 0 and n_ok == n_want
+
+    def serves(self, tickers, start, end) -> bool:
+        """
+        Whether run_screener answers this window from the store: a daily-only
+        window (both ends at 16:00) the store covers.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        return start.time() == dtime(16, 0) and end.time() == dtime(16, 0) and self.covers(tickers, start, end)
+
+    def source(self, tickers, start, end, source="") -> str:
+        """
+        The bar source a result_key should name for this window: the store
+        when it serves it, `source` otherwise, so a table read from the store
+        and one from downloads are never served for each other.
+        """
+        return f"daily_store:{self.path}" if not source and self.serves(tickers, start, end) else source
+
+    def screen(self, tickers, start, end, batch=BATCH) -> list:
+        """
+        run_screener's daily-only rows (Ticker, Price, PC (%), Total Volume,
+        Average Volume, Relative Volume) for the window [start's date, end's
+        date], the same numbers its download path gives: per batch of
+        `batch` tickers the window's rows are the days any of them has a
+        bar (a ticker without a bar on one counts it as a NaN row), and each
+        ticker's numbers are looked up under its '-' → '.' symbol within the
+        batch, so 'BRK-B' gets the zero row there too.
+        """
+        s = pd.Timestamp(start).date().isoformat()
+        e = pd.Timestamp(end).date().isoformat()
+        lb = (pd.Timestamp(start) - timedelta(days=BASELINE_DAYS)).date().isoformat()
+        tickers = list(tickers)
+        with self._lock, self._db:
+            self._want(tickers)
+            # per ticker: running totals before / at the end of the window and
+            # at both ends of the baseline ([lb, s))
+            per = {r[0]: r[1:] for r in self._db.execute("""
+                WITH k AS (
+                    SELECT w.ticker,
+                      (SELECT MAX(day) FROM bars WHERE ticker = w.ticker AND day >= :s AND day <= :e) AS d1,
+                      (SELECT MAX(day) FROM bars WHERE ticker = w.ticker AND day < :s) AS b1,
+                      (SELECT MAX(day) FROM bars WHERE ticker = w.ticker AND day < :lb) AS b0
+                    FROM want w)
+                SELECT k.ticker, l.cum_vol, p.seq, p.cum_vol, p.cum_n, q.seq, q.cum_vol, q.cum_n
+                FROM k CROSS JOIN bars l ON l.ticker = k.ticker AND l.day = k.d1
+                LEFT JOIN bars p ON p.ticker = k.ticker AND p.day = k.b1
+                LEFT JOIN bars q ON q.ticker = k.ticker AND q.day = k.b0
+            """, {"s": s, "e": e, "lb": lb})}
+            batches = []
+            for i in range(0, len(tickers), batch):
+                part = tickers[i:i + batch]
+                self._want(part)
+                u0, u1, n_rows = self._db.execute(
+                    "SELECT MIN(b.day), MAX(b.day), COUNT(DISTINCT b.day) FROM want w "
+                    "JOIN bars b ON b.ticker = w.ticker AND b.day >= ? AND b.day <= ?", (s, e)).fetchone()
+                ends = {r[0]: r[1:] for r in self._db.execute(
+                    "SELECT w.ticker, f.close, f.volume, l.close FROM want w "
+                    "LEFT JOIN bars f ON f.ticker = w.ticker AND f.day = ? "
+                    "LEFT JOIN bars l ON l.ticker = w.ticker AND l.day = ?", (u0, u1))}
+                batches.append((part, n_rows, ends))
+
+        nan = float("nan")
+        rows = []
+        for part, n_rows, ends in batches:
+            in_batch = set(part)
+            for t in part:
+                sym = t.replace("-", ".")
+                if sym not in in_batch or sym not in per:
+                    # no column for the symbol in the batch's daily frame
+                    rows.append({"Ticker": sym, "Price": None, "PC (%)": 0, "Total Volume": 0,
+                                 "Average Volume": 0, "Relative Volume": 0})
+                    continue
+                cum_end, seq_b1, cum_b1, n_b1, seq_b0, cum_b0, n_b0 = per[sym]
+                c0, v0, c1 = ends[sym]
+                c0 = nan if c0 is None else c0
+                c1 = nan if c1 is None else c1
+                # like compute_metrics on the slice: NaN volume counts as 0 and
+                # the first row's volume is left out
+                window_vol = cum_end - (cum_b1 or 0.0)
+                if n_rows > 1:
+                    total = int(window_vol - (v0 or 0.0))
+                    avg = total / (n_rows - 1)
+                else:
+                    total = int(window_vol)
+                    avg = float(total)
+                pct = ((c1 - c0) / c0 * 100) if c0 else 0
+                n_bl = (seq_b1 or 0) - (seq_b0 or 0)
+                n_vol = (n_b1 or 0) - (n_b0 or 0)
+                if n_bl == 0:
+                    baseline = avg
+                else:
+                    baseline = ((cum_b1 or 0.0) - (cum_b0 or 0.0)) / n_vol if n_vol else nan
+                rows.append({
+                    "Ticker":          sym,
+                    "Price":           round(c1, 2),
+                    "PC (%)":          round(pct, 2),
+                    "Total Volume":    total,
+                    "Average Volume":  round(avg),
+                    "Relative Volume": round(avg / baseline if baseline else 0, 2),
+                })
+        return rows
+
+    def latest(self, tickers) -> pd.DataFrame:
+        """
+        Each ticker's newest bar with its aggregates (close, returns, 20/90-day
+        average volume), indexed by ticker.
+        """
+        with self._lock, self._db:
+            self._want(tickers)
+            return pd.read_sql_query(
+                "SELECT b.* FROM want w JOIN tickers t ON t.ticker = w.ticker "
+                "JOIN bars b ON b.ticker = t.ticker AND b.day = t.last_day", self._db).set_index("ticker")
+
+
+def main(argv=None) -> int:
+    parse = argparse.ArgumentParser(description="Update the nightly daily-bar store")
+    parse.add_argument("tickers", help="CSV file with a 'Ticker' column")
+    parse.add_argument("--db", default="daily_bars.sqlite", help="SQLite file to create or update")
+    parse.add_argument("--through", default="", help="Last day to store (default: the last finished session)")
+    parse.add_argument("--history-days", type=int, default=HISTORY_DAYS, help="Calendar days to backfill for new tickers")
+    parse.add_argument("--bars-dir", default="", help="Read bars from <dir>/<TICKER>/*.csv instead of yfinance")
+    parse.add_argument("--rate", type=float, default=4.0, help="Provider requests per second")
+    args = parse.parse_args(argv)
+
+    from cli import read_tickers
+    try:
+        tickers = read_tickers(args.tickers)
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    t0 = time.perf_counter()
+    store = DailyStore(args.db)
+    try:
+        done = store.update(tickers, args.through or None,
+                            provider=LocalProvider(args.bars_dir) if args.bars_dir else None,
+                            scheduler=FetchScheduler(rate=args.rate), history_days=args.history_days)
+    finally:
+        store.close()
+    print(f"[daily store] {done['tickers']} tickers through {done['through']}: {done['new_bars']} new bars "
+          f"in {done['requests']} requests, {time.perf_counter() - t0:.2f}s → {args.db}", file=sys.stderr)
+    if done["no_bars"]:
+        print(f"[daily store] {done['no_bars']} ticker(s) came back without bars; retried on the next update",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,44 @@
+import os
 import streamlit as st
 import pandas as pd
-import yfinance as yf
-from screener import run_screener
-from datetime import date, timedelta, time
-from millify import millify as mf
-import math
+from screener import iter_screener
+from cache import BarCache
+from providers import LocalProvider
+from profiling import RunProfile
+from live import LiveScanner
+from window_grid import run_window_grid, DEFAULT_WINDOWS
+from table_view import result_schema, RankedResults, ResultCache, result_key, column_formats, result_page, PAGE_SIZE
+from service import ScreenerClient
+from daily_store import DailyStore
+from datetime import date, time
+
+LIVE_TOP_N = 20  # rows shown while a run is still streaming in
+# a shared screener service (python service.py) to send runs to instead of running them here
+SERVICE_URL = os.environ.get("SCREENER_SERVICE", "")
+# the nightly daily-bar store (python daily_store.py) daily-only runs are read from
+DAILY_STORE = os.environ.get("SCREENER_DAILY_STORE", "daily_bars.sqlite")
+
+@st.cache_resource
+def get_bar_cache():
+    # one on-disk bar cache shared by every rerun and session
+    return BarCache()
+
+@st.cache_resource
+def get_service():
+    return ScreenerClient(SERVICE_URL)
+
+@st.cache_resource
+def _open_daily_store(path):
+    return DailyStore(path)
+
+def get_daily_store():
+    # checked on every rerun, so a store built after the app started is picked up
+    return _open_daily_store(DAILY_STORE) if DAILY_STORE and os.path.exists(DAILY_STORE) else None
+
+@st.cache_resource
+def get_result_cache():
+    # finished runs keyed by (tickers hash, interval, start, end, prepost, source)
+    return ResultCache()
 
 # date limits
 st.title("Stock Screener Prototype")
@@ -88,6 +122,18 @@ with st.sidebar:
     with col2:
         end_minute = st.selectbox("End Minute", end_minute_options, index=len(end_minute_options) - 1)
 
+    # optional offline mode: read bars from <dir>/<TICKER>/*.csv instead of yfinance
+    bars_dir = st.text_input("Offline bar directory (optional)", value="")
+    diagnostics = st.checkbox("Collect run diagnostics", value=False)
+    compact = st.checkbox("Compact bar storage (lower memory)", value=False)
+    # live mode: keep the window open and only pull the newest bars each cycle
+    live_mode = st.checkbox("Live mode (keep refreshing)", value=False)
+    refresh_secs = st.number_input("Refresh every (seconds)", value=60, min_value=15, step=15, disabled=not live_mode)
+    # multi-window: one table with every lookback ending at End Date/Time
+    grid_mode = st.checkbox(f"Multi-window scan ({', '.join(DEFAULT_WINDOWS)})", value=False)
+    # pre/regular/post columns from the extended-hours bars the run downloads anyway
+    sessions = st.checkbox("Pre/post-market columns", value=False)
+
 start_time = time(start_hour, start_minute)
 end_time = time(end_hour, end_minute)
 market_open = time(9,30)
@@ -134,21 +180,121 @@ if tickers_csv is not None:
     tickers = tickers_df["Ticker"].astype(str).tolist()
 
  #print("Prepost: ", prepost)
-if st.button("Run Screener"):
-    df = run_screener(
-        tickers=tickers,
-        interval=interval,
-        start=start,
-        end=end,
-        num_days=num_days,
-        prepost=True
-    )
+def show_table():
+    # live runs fold in the newest bars, then re-apply the last filters
+    scanner = st.session_state.get("live")
+    if scanner is not None:
+        scanner.refresh()
+        raw = scanner.table()
+        ranked = RankedResults(raw)
+        st.session_state["raw"] = raw
+        st.session_state["ranked"] = ranked
+        args = st.session_state.get("filter_args")
+        st.session_state["filtered"] = ranked.filter(*args) if args else raw
+        st.caption(f"Live · updated {scanner.updated:%H:%M:%S} · {scanner.new_bars} new bars")
+
+    display_df = st.session_state.get("filtered", st.session_state["raw"])
+
+    # one page of plain numbers; the browser formats whole columns (no Styler,
+    # no per-cell strings), so the table stays sortable however big the run
+    n_rows = len(display_df)
+    page = 1
+    if n_rows > PAGE_SIZE:
+        page = st.number_input("Page", min_value=1, max_value=-(-n_rows // PAGE_SIZE), value=1, step=1)
+    rows, n_pages = result_page(display_df, page)
+    config = {c: st.column_config.NumberColumn(format=f) for c, f in column_formats(display_df).items()}
+    st.dataframe(rows, column_config=config, use_container_width=True)
+    if n_pages > 1:
+        first = (page - 1) * PAGE_SIZE
+        st.caption(f"Rows {first + 1:,}–{first + len(rows):,} of {n_rows:,}")
+
+run_clicked = st.button("Run Screener")
+if run_clicked and live_mode and not grid_mode and interval != "1d":
+    scanner = LiveScanner(
+        tickers, start, interval,
+        provider=LocalProvider(bars_dir) if bars_dir else None,
+        cache=None if bars_dir else get_bar_cache(),
+    ).start()
+    df = scanner.table()
+    st.session_state["live"] = scanner
+    st.session_state["raw"] = df
+    st.session_state["ranked"] = RankedResults(df)
+    st.session_state["filtered"] = df
+    st.session_state["show_results"] = True
+    st.session_state["profile"] = None
+elif run_clicked:
+    st.session_state.pop("live", None)
+    profile = RunProfile() if diagnostics else None
+    # an identical run (same tickers, window, bar source and mode) is served from the cache
+    store = None if bars_dir or SERVICE_URL else get_daily_store()
+    if grid_mode:
+        key = result_key(tickers, "grid:" + ",".join(DEFAULT_WINDOWS), end, end, False, bars_dir)
+    else:
+        key = result_key(tickers, interval + (":sessions" if sessions else "") + (":compact" if compact else ""),
+                         start, end, True, store.source(tickers, start, end) if store else bars_dir)
+    ranked = None if SERVICE_URL else get_result_cache().get(key)
+    if SERVICE_URL:
+        # the service owns the bar/result caches: identical runs from every
+        # session are downloaded and computed once
+        with st.spinner("Waiting for the screener service…"):
+            if grid_mode:
+                df, status = get_service().grid(tickers, end, DEFAULT_WINDOWS, source=bars_dir)
+            else:
+                df, status = get_service().screen(tickers, interval, start, end, True, source=bars_dir, compact=compact,
+                                                  sessions=sessions)
+        ranked, profile = RankedResults(df), None
+        st.caption(f"Screener service: {status}")
+    elif ranked is not None:
+        df, profile = ranked.raw, None
+        st.caption("Served from the result cache")
+    elif grid_mode:
+        with st.spinner("Screening every window…"):
+            df = run_window_grid(
+                tickers, end,
+                cache=None if bars_dir else get_bar_cache(),
+                provider=LocalProvider(bars_dir) if bars_dir else None,
+            )
+        ranked = get_result_cache().put(key, df, still_open=end.date() >= date.today())
+        profile = None
+    else:
+        # stream results batch by batch: progress bar + running top N while it works
+        progress = st.progress(0.0, text="Screening…")
+        live_top = st.empty()
+        chunks, done, top = [], 0, None
+        for chunk in iter_screener(
+            tickers=tickers,
+            interval=interval,
+            start=start,
+            end=end,
+            num_days=num_days,
+            prepost=True,
+            cache=None if bars_dir else get_bar_cache(),
+            provider=LocalProvider(bars_dir) if bars_dir else None,
+            profile=profile,
+            compact=compact,
+            sessions=sessions,
+            daily_store=store,
+        ):
+            chunks.append(chunk)
+            done += len(chunk)
+            progress.progress(min(done / max(len(tickers), 1), 1.0), text=f"Screened {done:,} / {len(tickers):,} tickers")
+            if not chunk.empty:
+                top = chunk if top is None else pd.concat([top, chunk], ignore_index=True)
+                top = top.nlargest(LIVE_TOP_N, "PC (%)")
+                live_top.dataframe(top, use_container_width=True)
+        progress.empty()
+        live_top.empty()
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        # a window that ends today is still filling in, so it only stays cached briefly
+        ranked = get_result_cache().put(key, df, still_open=end.date() >= date.today())
     if df.empty:
         st.write("No stocks passed the screener.")
 
     st.session_state["raw"] = df
-    st.session_state["filtered"] = df.copy()
+    st.session_state["ranked"] = ranked
+    st.session_state["filtered"] = df
     st.session_state["show_results"] = True
+    st.session_state["profile"] = profile
 
 
 if st.session_state.get("show_results") and "raw" in st.session_state:
@@ -159,85 +305,55 @@ if st.session_state.get("show_results") and "raw" in st.session_state:
         st.write("No stocks passed the screener.")
     else:
         # Detect schema (daily vs intraday) and set labels
-        is_daily = "Total Volume" in raw.columns
-        vol_col  = "Total Volume"   if is_daily else "Min Total Vol"
-        avg_col  = "Average Volume" if is_daily else "Avg Vol/Min"
-        rvol_col = "Relative Volume" if is_daily else "RVol (min)"
-        rank_choices = (["PC (%)", rvol_col, avg_col, vol_col]
-                        if is_daily else ["PC (%)","RVol (day)","RVol (min)","Avg Vol/Min","Min Total Vol"])
+        schema   = result_schema(raw)
+        is_daily = schema["is_daily"]
+        is_grid  = schema["is_grid"]
+        vol_col, avg_col, rvol_col = schema["vol_col"], schema["avg_col"], schema["rvol_col"]
+        rank_choices = schema["rank_choices"]
 
         with st.expander("Filters", expanded=True):
             with st.form("filter_form"):
                 c1, c2, c3 = st.columns(3)
-                pc_rng  = c1.slider("PC% range", -20.0, 20.0, (-2.0, 2.0))
-                min_vol = c2.number_input(f"Min {vol_col}", value=(1_000_000 if is_daily else 500_000), step=50_000)
-                min_avg = c3.number_input(f"Min {avg_col}", value=(1_000_000 if is_daily else 2_000), step=100)
+                pc_rng  = c1.slider(f"{schema['pc_col']} range" if is_grid else "PC% range", -20.0, 20.0, (-2.0, 2.0))
+                min_vol = c2.number_input(f"Min {vol_col}", value=(0 if is_grid else 1_000_000 if is_daily else 500_000), step=50_000)
+                min_avg = c3.number_input(f"Min {avg_col}", value=(0 if is_grid else 1_000_000 if is_daily else 2_000), step=100)
                 min_rv  = c1.number_input(f"Min {rvol_col}", value=0.8, step=0.1)
-                if not is_daily:
+                min_rv_day = None
+                if schema["rvol_day_col"]:
                     min_rv_day = c2.number_input("Min RVol (day)", value=0.8, step=0.1)
                 metric = c3.selectbox("Rank by", rank_choices, index=0)
                 top_n  = c3.number_input("Show top N", value=50, step=10)
                 apply  = st.form_submit_button("Apply filters")
 
         # apply filters on click, then keep them in session_state
-        f = raw.copy()
         if apply:
-            f = f[
-                (f["PC (%)"].between(pc_rng[0], pc_rng[1])) &
-                (f[vol_col] >= min_vol) &
-                (f[avg_col] >= min_avg) &
-                (f[rvol_col] >= min_rv)
-            ]
-            if not is_daily:
-                f = f[f["RVol (day)"] >= min_rv_day]
-            f = f.sort_values(metric, ascending=False).head(top_n)
+            f = st.session_state["ranked"].filter(pc_rng, min_vol, min_avg, min_rv, min_rv_day, metric, top_n)
             st.session_state["filtered"] = f
+            st.session_state["filter_args"] = (pc_rng, min_vol, min_avg, min_rv, min_rv_day, metric, top_n)
 
         # decide what we're showing
-        display_df = st.session_state.get("filtered", raw).copy()
-
-        # formatters that only attach to columns that exist (daily vs intraday)
-        formatters = {"Price": "{:,.2f}"}
-        if "PC (%)" in display_df.columns:
-            formatters["PC (%)"] = lambda x: f"{x:.2f}%"
-
-        from math import isnan  # optional; using pandas is better though
-        import pandas as pd
-
-        def _mill(x):
-            try:
-                # pd.isna handles None/NaN safely
-                return "" if pd.isna(x) else mf(x, precision=2)
-            except Exception:
-                return x
-
-        for col in [
-            "Min Total Vol","Avg Vol/Min","RVol (min)",
-            "Day Total Vol","Avg Vol/Day","RVol (day)",
-            "Total Volume","Average Volume","Relative Volume",
-        ]:
-            if col in display_df.columns:
-                formatters[col] = _mill
-
-        def color_change(val):
-            if isinstance(val, (int, float)):
-                return "color: green" if val > 0 else ("color: red" if val < 0 else "color: grey")
-            return "color: grey"
-
-        styler = display_df.style.format(formatters)
-        if "PC (%)" in display_df.columns:
-            styler = styler.map(color_change, subset=["PC (%)"])
-
-        # render the styled table
-        st.dataframe(styler, use_container_width=True)
+        if "live" in st.session_state:
+            st.fragment(show_table, run_every=refresh_secs)()
+        else:
+            show_table()
         # st.dataframe(st.session_state.get("filtered", raw), use_container_width=True)
 
         colA, colB = st.columns(2)
         with colA:
             if st.button("Reset filters"):
-                st.session_state["filtered"] = raw.copy()
+                st.session_state["filtered"] = raw
+                st.session_state.pop("filter_args", None)
         with colB:
             if st.button("Clear results"):
-                for k in ("raw","filtered","show_results"):
+                for k in ("raw","ranked","filtered","show_results","profile","live","filter_args"):
                     st.session_state.pop(k, None)
-                st.rerun()
\ No newline at end of file
+                st.rerun()
+
+    # per-stage timings of the last run, only when diagnostics were collected
+    profile = st.session_state.get("profile")
+    if profile is not None:
+        with st.expander("Run diagnostics", expanded=False):
+            st.write(profile.meta)
+            st.dataframe(profile.summary(), use_container_width=True)
+            st.caption("Per batch")
+            st.dataframe(profile.to_frame(), use_container_width=True)
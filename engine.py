@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+from compact import CompactBars
+from providers import SESSIONS, session_codes
+
+EXCHANGE_TZ = "America/New_York"
+
+INTRADAY_COLUMNS = [
+    "Ticker", "Price", "PC (%)",
+    "Min Total Vol", "Avg Vol/Min", "RVol (min)",
+    "Day Total Vol", "Avg Vol/Day", "RVol (day)",
+]
+SESSION_LABELS = ("Pre", "Reg", "Post")   # providers.SESSIONS order
+SESSION_COLUMNS = [f"{s} {m}" for s in SESSION_LABELS for m in ("PC (%)", "Vol", "RVol")]
+
+
+def _field(wide: pd.DataFrame, field: str, syms: list):
+    """
+    One field of a yf.download(..., group_by='ticker') frame as a (bars × tickers)
+    float64 array in `syms` order, plus a mask of which tickers were present.
+    Missing tickers come back as all-NaN columns.
+    """
+    n = len(syms)
+    if not isinstance(wide.columns, pd.MultiIndex) or wide.shape[1] == 0:
+        return np.full((len(wide), n), np.nan), np.zeros(n, dtype=bool)
+    present = np.isin(syms, wide.columns.get_level_values(0).unique())
+    block = wide.xs(field, axis=1, level=1).reindex(columns=syms)
+    return block.to_numpy(dtype="float64"), present
+
+
+def _minute_stats(df_min, syms):
+    """
+    Per-ticker minute-bar total volume, average volume per bar, first/last
+    close, plus which tickers count as present — from a wide frame or a
+    compact.CompactBars.
+    """
+    n = len(syms)
+    if isinstance(df_min, CompactBars):
+        cols = np.array([df_min.ids.get(s, -1) for s in syms], dtype="int64")
+        has_col = cols >= 0
+        has_min = has_col & (not df_min.empty)
+        safe = np.where(has_col, cols, 0)
+        if df_min.empty:
+            total = avg = first = last = np.full(n, np.nan)
+        else:
+            total = df_min.sum("Volume")[safe]
+            avg   = df_min.mean("Volume")[safe]
+            first = np.where(has_col, df_min.first("Close")[safe], np.nan)
+            last  = np.where(has_col, df_min.last("Close")[safe], np.nan)
+    else:
+        vol_min, has_col = _field(df_min, "Volume", syms)
+        has_min = has_col & (not df_min.empty)
+        vol_min = np.nan_to_num(vol_min, nan=0.0)
+        if len(vol_min):
+            total = vol_min.sum(axis=0)
+            avg   = vol_min.mean(axis=0)
+        else:
+            total = avg = np.zeros(n)
+        close_min, _ = _field(df_min, "Close", syms)
+        first = close_min[0] if len(close_min) else np.full(n, np.nan)
+        last  = close_min[-1] if len(close_min) else np.full(n, np.nan)
+    total = np.where(has_min, np.trunc(total), 0.0)
+    avg   = np.where(has_min, avg, 0.0)
+    return total, avg, has_min, first, last, has_col
+
+
+def day_stats(df_day: pd.DataFrame, df_baseline: pd.DataFrame, syms: list) -> dict:
+    """
+    Everything intraday_table needs from the daily and 90d baseline frames,
+    per ticker in `syms` order. These don't change while the minute bars of a
+    window keep coming in, so live.LiveScanner computes them once.
+    """
+    n = len(syms)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_day, has_day = _field(df_day, "Volume", syms)
+        vol_day = np.nan_to_num(vol_day, nan=0.0)
+        n_days = len(vol_day)
+        if n_days > 1:
+            total_day = np.trunc(vol_day.sum(axis=0) - vol_day[0])   # skip the first day
+            avg_day   = total_day / (n_days - 1)
+        else:
+            total_day = np.trunc(vol_day.sum(axis=0)) if n_days else np.zeros(n)
+            avg_day   = total_day.copy()
+        total_day = np.where(has_day, total_day, 0.0)
+        avg_day   = np.where(has_day, avg_day, 0.0)
+
+        vol_bl, has_bl = _field(df_baseline, "Volume", syms)
+        counts = (~np.isnan(vol_bl)).sum(axis=0)
+        bl_mean = np.where(counts > 0, np.nansum(vol_bl, axis=0) / np.maximum(counts, 1), np.nan)
+        baseline = np.where(has_bl, bl_mean, avg_day)
+
+    close_day, _ = _field(df_day, "Close", syms)
+    nan = np.full(n, np.nan)
+    return {
+        "total": total_day, "avg": avg_day, "has": has_day, "n_days": n_days, "baseline": baseline,
+        "first": close_day[0] if n_days else nan, "last": close_day[-1] if n_days else nan,
+    }
+
+
+def assemble_table(syms: list, interval: str, minute: tuple, day: dict, n_min_rows: int) -> pd.DataFrame:
+    """
+    Result table from _minute_stats-style minute numbers, day_stats() and the
+    number of minute rows the batch had.
+    """
+    n = len(syms)
+    total_min, avg_min, has_min, min_first, min_last, has_min_col = minute
+    total_day, avg_day, has_day, n_days, baseline = day["total"], day["avg"], day["has"], day["n_days"], day["baseline"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # ─── RELATIVE VOLUME ─────────────────────────────────────────────────
+        bars_per_day = 390.0 / (2.0 if interval == "2m" else 1.0)
+        rvol_min = np.where(baseline != 0, avg_min / (baseline / bars_per_day), 0.0)
+        rvol_day = np.where(baseline != 0, avg_day / baseline, 0.0)
+
+        # ─── PRICE CHANGE (daily bars first, minute bars as fallback) ───────
+        use_day = has_day & (n_days > 0)
+        use_min = ~use_day & has_min_col & (n_min_rows > 0)
+        nan = np.full(n, np.nan)
+        first_o = np.where(use_day, day["first"], np.where(use_min, min_first, nan))
+        last_c  = np.where(use_day, day["last"], np.where(use_min, min_last, nan))
+        has_price = use_day | use_min
+        pct = np.where(has_price & (first_o != 0), (last_c - first_o) / first_o * 100, 0.0)
+        price_ok = has_price & (last_c != 0)
+
+    price = np.where(price_ok, np.round(last_c, 2), np.nan)
+    table = pd.DataFrame({
+        "Ticker":        syms,
+        "Price":         price if price_ok.any() else [None] * n,
+        "PC (%)":        np.round(pct, 2),
+        "Min Total Vol": total_min.astype("int64") if has_min.all() else total_min,
+        "Avg Vol/Min":   avg_min,
+        "RVol (min)":    np.round(rvol_min, 2),
+        "Day Total Vol": total_day.astype("int64") if has_day.all() else total_day,
+        "Avg Vol/Day":   avg_day,
+        "RVol (day)":    np.round(rvol_day, 2),
+    }, columns=INTRADAY_COLUMNS)
+    return table
+
+
+def intraday_table(df_min: pd.DataFrame, df_day: pd.DataFrame, df_baseline: pd.DataFrame,
+                   batch: list, interval: str) -> pd.DataFrame:
+    """
+    Whole-batch version of run_screener's intraday per-ticker loop.
+
+    Given the minute bars (wide frame or compact.CompactBars), daily and 90d
+    baseline frames for a batch, computes
+    Min Total Vol, Avg Vol/Min, RVol (min), Day Total Vol, Avg Vol/Day,
+    RVol (day), Price and PC (%) for every ticker at once with column-wise
+    numpy reductions. Values match the loop row for row, including its
+    fallbacks for tickers missing from one of the frames.
+    """
+    syms = [t.replace("-", ".") for t in batch]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        minute = _minute_stats(df_min, syms)
+    return assemble_table(syms, interval, minute, day_stats(df_day, df_baseline, syms), len(df_min))
+
+
+# ─── PRE / REGULAR / POST ────────────────────────────────────────────────────
+def session_stats(df_min, syms) -> dict:
+    """
+    Per-session raw numbers for a batch's minute bars, taken before any
+    market-hours filter: every bar is tagged pre / regular / post from its
+    exchange-local time (providers.session_codes) and one pass over the
+    (bars × tickers) blocks gives, per session and ticker, the volume, the
+    bars with a close and the first/last close. Arrays are (3 × tickers) in
+    providers.SESSIONS order.
+
+    Wide frames need a tz-aware index (or naive exchange-local stamps);
+    compact.CompactBars hold naive UTC, which is converted first.
+    """
+    n = len(syms)
+    if isinstance(df_min, CompactBars):
+        cols = np.array([df_min.ids.get(s, -1) for s in syms], dtype="int64")
+        has_col = cols >= 0
+        safe = np.where(has_col, cols, 0)
+        stamps = df_min.index.tz_localize("UTC").tz_convert(EXCHANGE_TZ)
+        close = np.where(has_col, df_min.field("Close")[:, safe].astype("float64"), np.nan)
+        vol = np.where(has_col, df_min.field("Volume")[:, safe].astype("float64"), 0.0)
+    else:
+        stamps = pd.DatetimeIndex(df_min.index) if len(df_min) else pd.DatetimeIndex([])
+        close, _ = _field(df_min, "Close", syms)
+        vol, _ = _field(df_min, "Volume", syms)
+        vol = np.nan_to_num(vol, nan=0.0)
+
+    codes = session_codes(stamps) if len(stamps) else np.empty(0, "int8")
+    onehot = (codes[None, :] == np.arange(len(SESSIONS))[:, None])     # sessions × bars
+    traded = ~np.isnan(close)
+    total = onehot.astype("float64") @ vol
+    bars = np.zeros((len(SESSIONS), n))
+    first = np.full((len(SESSIONS), n), np.nan)
+    last = np.full((len(SESSIONS), n), np.nan)
+    rows = np.arange(n)
+    for k in range(len(SESSIONS)):
+        hit = traded & onehot[k][:, None]
+        bars[k] = hit.sum(axis=0)
+        some = bars[k] > 0
+        if not some.any():
+            continue
+        lo = hit.argmax(axis=0)
+        hi = len(hit) - 1 - hit[::-1].argmax(axis=0)
+        first[k] = np.where(some, close[lo, rows], np.nan)
+        last[k] = np.where(some, close[hi, rows], np.nan)
+    return {"total": total, "bars": bars, "first": first, "last": last}
+
+
+def session_table(stats: dict, baseline, interval: str) -> pd.DataFrame:
+    """
+    SESSION_COLUMNS from session_stats() and the per-ticker 90-day average
+    daily volume (day_stats()["baseline"]):
+
+      • <S> PC (%): first → last close within the session's bars
+      • <S> Vol:    the session's total volume
+      • <S> RVol:   volume per traded bar against the baseline's per-minute
+                    pace over a regular session, like RVol (min), so
+                    extended-hours bars read on the same scale
+
+    A ticker without bars in a session gets 0 in that session's columns.
+    """
+    bars_per_day = 390.0 / (2.0 if interval == "2m" else 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(stats["bars"] > 0, stats["total"] / stats["bars"], 0.0)
+        pace = np.asarray(baseline, dtype="float64") / bars_per_day
+        rvol = np.where((pace > 0) & np.isfinite(pace), avg / pace, 0.0)
+        first, last = stats["first"], stats["last"]
+        pct = np.where(np.isfinite(first) & np.isfinite(last) & (first != 0), (last - first) / first * 100, 0.0)
+    out = {}
+    for k, label in enumerate(SESSION_LABELS):
+        out[f"{label} PC (%)"] = np.round(pct[k], 2)
+        out[f"{label} Vol"] = np.trunc(stats["total"][k]).astype("int64")
+        out[f"{label} RVol"] = np.round(rvol[k], 2)
+    return pd.DataFrame(out, columns=SESSION_COLUMNS)
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def momentum_screener(df, momentum_threshold):
@@ -11,4 +12,14 @@ def momentum_screener(df, momentum_threshold):
     start_price = df['Close'].iloc[0]
     end_price = df['Close'].iloc[-1]
     price_change = abs((end_price - start_price) / start_price * 100)
-    return price_change > momentum_threshold
\ No newline at end of file
+    return price_change > momentum_threshold
+
+
+def momentum_mask(start_price, end_price, momentum_threshold):
+    """
+    momentum_screener for many tickers at once: one first and one last close
+    per ticker in, one bool per ticker out.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_change = np.abs((end_price - start_price) / start_price * 100)
+    return price_change > momentum_threshold
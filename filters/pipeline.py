@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+
+from filters.momentum import momentum_mask
+from filters.volume_spike import volume_spike_mask
+
+
+class Panel:
+    """
+    The whole universe as (bars × tickers) float64 arrays, one per field.
+
+    Rows are right-aligned: the last row is every ticker's latest bar, and a
+    ticker with a shorter history is NaN-padded at the top. first_row[j] is
+    the row of ticker j's first bar, so a single-ticker frame df maps to
+    rows first_row[j]: of column j and the per-ticker screeners give the same
+    answers as the filters below.
+    """
+
+    def __init__(self, tickers, fields: dict, lengths=None):
+        self.tickers = list(tickers)
+        self.fields = fields
+        n_rows = next(iter(fields.values())).shape[0] if fields else 0
+        self.n_rows = n_rows
+        self.lengths = np.full(len(self.tickers), n_rows) if lengths is None else np.asarray(lengths)
+        self.first_row = np.minimum(n_rows - self.lengths, max(n_rows - 1, 0))
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __getitem__(self, field) -> np.ndarray:
+        return self.fields[field]
+
+    @classmethod
+    def from_frames(cls, frames: dict, fields=("Close", "Volume"), max_bars=None) -> "Panel":
+        """
+        {ticker: OHLCV frame} → Panel; max_bars keeps only each ticker's last N bars.
+        """
+        tickers = list(frames)
+        lengths = np.array([len(frames[t]) for t in tickers], dtype="int64")
+        if max_bars is not None:
+            lengths = np.minimum(lengths, max_bars)
+        n_rows = int(lengths.max()) if len(lengths) else 0
+        out = {f: np.full((n_rows, len(tickers)), np.nan) for f in fields}
+        for j, t in enumerate(tickers):
+            k = lengths[j]
+            if k == 0:
+                continue
+            df = frames[t]
+            for f in fields:
+                if f in df.columns:
+                    out[f][n_rows - k:, j] = df[f].to_numpy(dtype="float64")[-k:]
+        return cls(tickers, out, lengths)
+
+    @classmethod
+    def from_wide(cls, wide: pd.DataFrame, fields=("Close", "Volume")) -> "Panel":
+        """
+        A yf.download(..., group_by='ticker') frame → Panel on its shared index
+        (the same rows wide[ticker] would give each screener).
+        """
+        if wide.empty or not isinstance(wide.columns, pd.MultiIndex):
+            return cls([], {f: np.empty((0, 0)) for f in fields})
+        tickers = list(wide.columns.get_level_values(0).unique())
+        out = {f: wide.xs(f, axis=1, level=1).reindex(columns=tickers).to_numpy(dtype="float64") for f in fields}
+        return cls(tickers, out)
+
+    @classmethod
+    def from_compact(cls, bars, fields=("Close", "Volume")) -> "Panel":
+        """
+        compact.CompactBars (with its current selection) → Panel.
+        """
+        return cls(bars.tickers, {f: bars.field(f).astype("float64") for f in fields})
+
+
+# ─── FILTERS ─────────────────────────────────────────────────────────────────
+class Filter:
+    """
+    One screening criterion over a Panel.
+
+    mask(panel, cols) returns one bool per column in `cols` (an int array of
+    ticker columns still in play). Calling the filter does the same and keeps
+    a running pass rate, which All/Any use to put the cheapest, most
+    selective filters first. Combine with & (All), | (Any) and ~ (Not).
+    """
+    cost = 1.0
+
+    def __init__(self):
+        self.seen = 0
+        self.passed = 0
+
+    def mask(self, panel, cols) -> np.ndarray:
+        raise NotImplementedError
+
+    def __call__(self, panel, cols=None) -> np.ndarray:
+        if cols is None:
+            cols = np.arange(len(panel))
+        m = np.asarray(self.mask(panel, cols), dtype=bool)
+        self.seen += len(cols)
+        self.passed += int(m.sum())
+        return m
+
+    @property
+    def pass_rate(self) -> float:
+        # starts at 0.5 and follows what the filter has actually let through
+        return (self.passed + 1) / (self.seen + 2)
+
+    def __and__(self, other):
+        return All(self, other)
+
+    def __or__(self, other):
+        return Any(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Momentum(Filter):
+    """
+    |last close − first close| / first close > threshold %  (momentum_screener).
+    """
+    cost = 1.0
+
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+
+    def mask(self, panel, cols):
+        if panel.n_rows == 0:
+            return np.zeros(len(cols), dtype=bool)
+        close = panel["Close"]
+        return momentum_mask(close[panel.first_row[cols], cols], close[-1, cols], self.threshold)
+
+    def __repr__(self):
+        return f"Momentum({self.threshold})"
+
+
+class VolumeSpike(Filter):
+    """
+    |last volume − mean of last `window` volumes| / mean > threshold %  (volume_spike_screener).
+    """
+
+    def __init__(self, threshold, window=20):
+        super().__init__()
+        self.threshold = threshold
+        self.window = window
+        self.cost = 1.0 + window / 10
+
+    def mask(self, panel, cols):
+        return volume_spike_mask(panel["Volume"][-self.window:, cols], self.threshold, self.window)
+
+    def __repr__(self):
+        return f"VolumeSpike({self.threshold}, window={self.window})"
+
+
+class Not(Filter):
+    def __init__(self, inner):
+        super().__init__()
+        self.inner = inner
+        self.cost = inner.cost
+
+    def mask(self, panel, cols):
+        return ~self.inner(panel, cols)
+
+    def __repr__(self):
+        return f"~{self.inner!r}"
+
+
+class All(Filter):
+    """
+    AND of its filters. Each one only sees the tickers that passed the ones
+    before it, ordered by cost / (1 − pass rate): cheap filters that reject
+    most names run first.
+    """
+
+    def __init__(self, *filters):
+        super().__init__()
+        self.filters = [g for f in filters for g in (f.filters if type(f) is All else [f])]
+        self.cost = sum(f.cost for f in self.filters)
+
+    def order(self):
+        return sorted(self.filters, key=lambda f: f.cost / max(1.0 - f.pass_rate, 1e-6))
+
+    def mask(self, panel, cols):
+        cols = np.asarray(cols)
+        alive = np.arange(len(cols))
+        for f in self.order():
+            if len(alive) == 0:
+                break
+            alive = alive[f(panel, cols[alive])]
+        out = np.zeros(len(cols), dtype=bool)
+        out[alive] = True
+        return out
+
+    def __repr__(self):
+        return "(" + " & ".join(map(repr, self.filters)) + ")"
+
+
+class Any(Filter):
+    """
+    OR of its filters. Each one only sees the tickers no earlier filter has
+    accepted, ordered by cost / pass rate: cheap filters that accept most
+    names run first.
+    """
+
+    def __init__(self, *filters):
+        super().__init__()
+        self.filters = [g for f in filters for g in (f.filters if type(f) is Any else [f])]
+        self.cost = sum(f.cost for f in self.filters)
+
+    def order(self):
+        return sorted(self.filters, key=lambda f: f.cost / max(f.pass_rate, 1e-6))
+
+    def mask(self, panel, cols):
+        cols = np.asarray(cols)
+        out = np.zeros(len(cols), dtype=bool)
+        left = np.arange(len(cols))
+        for f in self.order():
+            if len(left) == 0:
+                break
+            hit = f(panel, cols[left])
+            out[left[hit]] = True
+            left = left[~hit]
+        return out
+
+    def __repr__(self):
+        return "(" + " | ".join(map(repr, self.filters)) + ")"
+
+
+def screen(panel: Panel, criteria: Filter) -> list:
+    """
+    Tickers in `panel` that pass `criteria`.
+    """
+    if len(panel) == 0:
+        return []
+    hit = criteria(panel)
+    return [t for t, ok in zip(panel.tickers, hit) if ok]
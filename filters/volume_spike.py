@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def volume_spike_screener(df, volume_threshold):
@@ -13,4 +14,19 @@ def volume_spike_screener(df, volume_threshold):
         return False
     current_volume = df['Volume'].iloc[-1]
     volume_change = abs((current_volume - avg_volume) / avg_volume * 100)
-    return volume_change > volume_threshold
\ No newline at end of file
+    return volume_change > volume_threshold
+
+
+def volume_spike_mask(volume, volume_threshold, window=20):
+    """
+    volume_spike_screener for many tickers at once, reading only the last
+    `window` bars of the (bars × tickers) volume array instead of a full
+    rolling mean. Tickers with fewer than `window` bars (NaN padding) fail.
+    """
+    if volume.shape[0] < window:
+        return np.zeros(volume.shape[1], dtype=bool)
+    avg_volume = volume[-window:].mean(axis=0)
+    current_volume = volume[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volume_change = np.abs((current_volume - avg_volume) / avg_volume * 100)
+    return (avg_volume != 0) & (volume_change > volume_threshold)
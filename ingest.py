@@ -0,0 +1,129 @@
+"""
+Bulk ingestion of vendor export.csv minute files.
+
+    python ingest.py drops/ --store bar_store --workers 8
+    python ingest.py drops/ --store bar_store --tickers SPY,QQQ --chunksize 100000
+
+drops/ uses LocalProvider's layout (<TICKER>/*.csv, any number of files per
+ticker). Files are read in chunks with an explicit dtype per column, their
+stamps go through the vectorized parse_export_timestamps, and files are
+spread over worker processes. Each ticker's bars are then merged, sorted and
+de-duplicated into the screener's layout (Open, High, Low, Close, Adj Close,
+Volume on naive exchange-local minutes) with a Session column, and
+optionally written into a BarStore.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from providers import parse_export_timestamps, tag_sessions
+from store import BarStore
+
+CHUNKSIZE = 250_000
+DTYPES = {"Date": object, "Open": "float64", "High": "float64", "Low": "float64",
+          "Close": "float64", "Volume": "float64"}
+
+
+def find_files(root, tickers=None) -> dict:
+    """
+    {ticker: [csv paths]} under root/<TICKER>/*.csv.
+    """
+    if tickers is None:
+        tickers = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    files = {t: sorted(glob.glob(os.path.join(root, t, "*.csv"))) for t in tickers}
+    return {t: f for t, f in files.items() if f}
+
+
+def read_export_chunked(path, chunksize=CHUNKSIZE) -> pd.DataFrame:
+    """
+    One export.csv-style file → OHLCV frame on naive exchange-local stamps,
+    read `chunksize` rows at a time.
+    """
+    parts = []
+    for raw in pd.read_csv(path, usecols=list(DTYPES), dtype=DTYPES, chunksize=chunksize):
+        df = raw[["Open", "High", "Low", "Close", "Volume"]]
+        df.index = parse_export_timestamps(raw["Date"])
+        parts.append(df)
+    if not parts:
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"], dtype="float64")
+    return pd.concat(parts) if len(parts) > 1 else parts[0]
+
+
+def normalize_bars(parts) -> pd.DataFrame:
+    """
+    Frames from read_export_chunked for one ticker → one sorted frame in the
+    screener's bar layout, later files winning on repeated stamps, with
+    every bar tagged pre / regular / post.
+    """
+    df = pd.concat(parts) if len(parts) > 1 else parts[0]
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    df = df.dropna(subset=["Close"])
+    df.insert(4, "Adj Close", df["Close"])
+    df.index.name = "Datetime"
+    df["Session"] = tag_sessions(df.index)
+    return df
+
+
+def _read_one(path, chunksize):
+    return path, read_export_chunked(path, chunksize)
+
+
+def ingest(root, tickers=None, workers=None, chunksize=CHUNKSIZE) -> dict:
+    """
+    {ticker: normalized bars} for every ticker directory under root (or only
+    `tickers`). Files are parsed in `workers` processes.
+    """
+    files = find_files(root, tickers)
+    paths = [p for t in files for p in files[t]]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    if workers == 1:
+        read = dict(_read_one(p, chunksize) for p in paths)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            read = dict(pool.map(_read_one, paths, [chunksize] * len(paths), chunksize=4))
+    out = {}
+    for t, fs in files.items():
+        parts = [read[p] for p in fs if not read[p].empty]
+        if parts:
+            out[t] = normalize_bars(parts)
+    return out
+
+
+def ingest_to_store(root, store_root, tickers=None, workers=None, chunksize=CHUNKSIZE,
+                    tz="America/New_York") -> BarStore:
+    """
+    ingest() and fold the bars into the 1m BarStore at store_root.
+    """
+    return BarStore.merge(store_root, ingest(root, tickers, workers, chunksize), "1m", tz)
+
+
+def main(argv=None) -> int:
+    parse = argparse.ArgumentParser(description="Ingest vendor export.csv minute files")
+    parse.add_argument("root", help="Directory of <TICKER>/*.csv files")
+    parse.add_argument("--store", required=True, help="BarStore root to write the 1m bars into")
+    parse.add_argument("--tickers", default="", help="Comma-separated subset of tickers")
+    parse.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parse.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Rows per read_csv chunk")
+    args = parse.parse_args(argv)
+    if not os.path.isdir(args.root):
+        print(f"error: {args.root} is not a directory", file=sys.stderr)
+        return 2
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()] or None
+
+    t0 = time.perf_counter()
+    bars = ingest(args.root, tickers, args.workers, args.chunksize)
+    t1 = time.perf_counter()
+    store = BarStore.merge(args.store, bars, "1m")
+    rows = sum(len(df) for df in bars.values())
+    print(f"[ingest] {len(bars)} tickers, {rows:,} bars parsed in {t1 - t0:.2f}s, "
+          f"store {len(store)} tickers written in {time.perf_counter() - t1:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import threading
+import numpy as np
+import pandas as pd
+from datetime import time, timedelta
+
+from compact import CompactBars
+from engine import day_stats, assemble_table
+from providers import YFinanceProvider
+from scheduler import FetchScheduler
+from screener import _download
+from planner import FetchPlan
+
+BATCH_SIZE = 200
+
+
+class _BatchState:
+    """
+    Running minute-bar state for one batch of tickers.
+
+      • rows:        distinct bar stamps seen so far (what the averages divide by)
+      • last_stamp:  newest stamp (naive UTC ns), None before the first bars
+      • cum_vol:     per-ticker volume summed over every bar so far
+      • first/last:  close at the batch's first and newest stamp (NaN if the
+                     ticker has no bar there), like close[0] / close[-1]
+      • last_vol:    volume at the newest stamp, so a still-forming bar can be
+                     replaced when the provider revises it
+      • has_col:     ticker was ever part of a minute download
+    """
+
+    def __init__(self, syms, day):
+        n = len(syms)
+        self.syms = syms
+        self.day = day
+        self.rows = 0
+        self.last_stamp = None
+        self.cum_vol = np.zeros(n)
+        self.first = np.full(n, np.nan)
+        self.last = np.full(n, np.nan)
+        self.last_vol = np.zeros(n)
+        self.has_col = np.zeros(n, dtype=bool)
+
+    def update(self, bars: CompactBars):
+        """
+        Fold newly downloaded (already session-filtered) bars in. Stamps older
+        than last_stamp are ignored, a repeat of last_stamp replaces it.
+        Work is proportional to the number of new bars.
+        """
+        if self.last_stamp is not None:
+            bars = bars.between_dates(pd.Timestamp(self.last_stamp))
+        cols = np.array([bars.ids.get(s, -1) for s in self.syms], dtype="int64")
+        present = cols >= 0
+        self.has_col |= present
+        if bars.empty:
+            return 0
+        safe = np.where(present, cols, 0)
+        stamps = bars.index.asi8
+        vol = np.nan_to_num(bars.field("Volume")[:, safe].astype("float64"), nan=0.0)
+        close = bars.field("Close")[:, safe].astype("float64")
+        vol[:, ~present] = 0.0
+        close[:, ~present] = np.nan
+
+        # the newest bar may come back again with more volume: swap it out
+        revised = int(self.last_stamp is not None and stamps[0] == self.last_stamp)
+        if revised:
+            self.cum_vol -= self.last_vol
+        if self.rows == revised:
+            self.first = close[0]
+        added = len(stamps) - revised
+        self.rows += added
+        self.cum_vol += vol.sum(axis=0)
+        self.last = close[-1]
+        self.last_vol = vol[-1]
+        self.last_stamp = int(stamps[-1])
+        return added
+
+    def minute_stats(self):
+        # same shape as engine._minute_stats
+        has_min = self.has_col & (self.rows > 0)
+        total = np.where(has_min, np.trunc(self.cum_vol), 0.0)
+        avg = np.where(has_min, self.cum_vol / max(self.rows, 1), 0.0)
+        return total, avg, has_min, self.first, self.last, self.has_col
+
+
+class LiveScanner:
+    """
+    Incremental run_screener for a window that is still open.
+
+    start() downloads the window once — minute bars from `start` up to now,
+    plus the daily and 90-day baseline bars, which can't change until the
+    session ends. Each refresh() after that only asks the provider for bars
+    from the newest stamp on and folds them into per-ticker running state
+    (cumulative volume, bar count, first/last close, baseline), so a cycle
+    costs O(new bars). table() gives the same columns and numbers as
+    run_screener(tickers, interval, start, now, ...).
+
+        scanner = LiveScanner(tickers, start, "1m")
+        scanner.start()
+        ...
+        scanner.refresh(); df = scanner.table()
+
+    `clock` returns "now" as a naive exchange-local timestamp; pass one to
+    replay a past session from a LocalProvider.
+    """
+
+    def __init__(self, tickers, start, interval="1m", prepost=True, provider=None, scheduler=None,
+                 cache=None, tz="America/New_York", clock=None):
+        self.tickers = list(tickers)
+        self.start_ts = pd.Timestamp(start)
+        self.interval = interval
+        self.prepost = prepost
+        self.provider = provider or YFinanceProvider()
+        self.scheduler = scheduler or FetchScheduler()
+        self.cache = cache
+        self.tz = tz
+        self.clock = clock or (lambda: pd.Timestamp.now(tz=tz).tz_localize(None))
+        self.batches = [self.tickers[i:i + BATCH_SIZE] for i in range(0, len(self.tickers), BATCH_SIZE)]
+        self.states = []
+        self.updated = None
+        self.new_bars = 0
+        self._lock = threading.Lock()
+
+    # ─── FETCH ───────────────────────────────────────────────────────────────
+    def _minute_bars(self, batch, since, now):
+        wide = _download(self.provider, batch, since, now, self.interval, self.prepost, None, self.scheduler)
+        # the same naive-UTC session filter run_screener applies
+        return CompactBars.from_wide(wide).between_time(time(9, 30), time(16, 0))
+
+    def _since(self, state):
+        if state.last_stamp is None:
+            return self.start_ts
+        # newest stamp back to exchange-local time; it is fetched again on purpose
+        return pd.Timestamp(state.last_stamp, tz="UTC").tz_convert(self.tz).tz_localize(None)
+
+    def start(self):
+        """
+        Download the window so far and build the running state.
+        """
+        now = self.clock()
+        start = self.start_ts
+        lb_start = (start - pd.Timedelta(days=90)).date()
+        lb_end = (start - pd.Timedelta(days=1)).date()
+        # baseline and every batch's daily bars are adjacent ranges: one request
+        plan = FetchPlan()
+        plan.need("baseline", self.tickers, lb_start, lb_end + timedelta(days=1), "1d", False)
+        for n, batch in enumerate(self.batches):
+            plan.need(n, batch, start.date(), now.date() + timedelta(days=1), "1d", False)
+        plan.fetch(lambda *req: _download(self.provider, *req, self.cache, self.scheduler), self.scheduler)
+        df_baseline = plan.get("baseline")
+
+        def fetch_batch(numbered):
+            n, batch = numbered
+            df_day = plan.get(n)
+            if start.time() != time(16, 0):
+                df_day = df_day[df_day.index.date >= start.date()]
+            df_day = df_day[df_day.index.date < now.date()]  # today's daily bar is still forming
+            return df_day, self._minute_bars(batch, start, now)
+
+        states = []
+        for (_, batch), (df_day, bars) in self.scheduler.run(list(enumerate(self.batches)), fetch_batch):
+            syms = [t.replace("-", ".") for t in batch]
+            state = _BatchState(syms, day_stats(df_day, df_baseline, syms))
+            state.update(bars)
+            states.append(state)
+        with self._lock:
+            self.states = states
+            self.updated = now
+        return self
+
+    def refresh(self):
+        """
+        Pull only bars newer than what each batch has seen; returns how many
+        new bar stamps were added across batches.
+        """
+        if not self.states:
+            self.start()
+            return sum(s.rows for s in self.states)
+        now = self.clock()
+        pairs = list(zip(self.batches, self.states))
+        added = 0
+        for (batch, state), bars in self.scheduler.run(
+                pairs, lambda p: self._minute_bars(p[0], self._since(p[1]), now)):
+            with self._lock:
+                added += state.update(bars)
+        with self._lock:
+            self.updated = now
+            self.new_bars = added
+        return added
+
+    # ─── RESULTS ─────────────────────────────────────────────────────────────
+    def table(self) -> pd.DataFrame:
+        """
+        Current result table, same layout as run_screener's intraday output.
+        """
+        with self._lock:
+            parts = [assemble_table(s.syms, self.interval, s.minute_stats(), s.day, s.rows) for s in self.states]
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
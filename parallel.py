@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from window_index import _segments
+
+# tickers in one compute() below which run_screener stays serial: a call
+# costs ~20 ms of copying and dispatch on top of the sharded work, which
+# a batch this small only wins back with about 4 cores or more
+MIN_SHARDED = 64
+
+
+def _context():
+    """
+    Start method for the workers: the pool is started from inside a run,
+    while the FetchScheduler's download threads (and the dashboard's or
+    service's) are running, and a plain fork could copy a lock one of them
+    holds into a worker that then waits on it forever.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# ─── WORKER SIDE ─────────────────────────────────────────────────────────────
+_views = {}
+_blocks = []
+_spec = []
+
+
+def _attach(spec):
+    """
+    Map the parent's shared blocks of one compute() call as numpy arrays,
+    once per process and call; the previous call's blocks are let go.
+    """
+    if _spec and _spec[0] == spec:
+        return
+    _views.clear()
+    for shm in _blocks:
+        try:
+            shm.close()
+        except BufferError:
+            pass  # a view is still alive somewhere; unmapped when it goes
+    _blocks.clear()
+    _spec[:] = [spec]
+    for field, (name, dtype, shape) in spec.items():
+        if dtype == "npy":
+            # a BarStore file: map it too, every worker shares the page cache
+            _views[field] = np.load(name, mmap_mode="r")
+            continue
+        shm = shared_memory.SharedMemory(name=name)
+        _blocks.append(shm)
+        _views[field] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _metrics_shard(spec, lo, hi):
+    """
+    compute_metrics for tickers lo..hi-1, rebuilding each slice from the shared
+    arrays instead of receiving a pickled DataFrame.
+    """
+    from screener import compute_metrics
+
+    _attach(spec)
+    v = _views
+    out = []
+    for j in range(lo, hi):
+        a, b = v["starts"][j], v["ends"][j]
+        df_slice = pd.DataFrame(
+            {"Close": v["close"][a:b], "Volume": v["vol"][a:b]},
+            index=pd.DatetimeIndex(v["stamps"][a:b].view("datetime64[ns]")),
+        )
+        # a one-row frame whose mean is the baseline; no baseline at all = empty frame
+        df_bl = pd.DataFrame({"Volume": [v["baseline"][j]]}) if v["has_base"][j] else pd.DataFrame()
+        out.append(compute_metrics(df_slice, df_bl))
+    return lo, out
+
+
+# ─── PARENT SIDE ─────────────────────────────────────────────────────────────
+class MetricPool:
+    """
+    Process pool for compute_metrics over many tickers.
+
+        with MetricPool(workers=32) as pool:
+            for slices, baseline in batches:
+                df = pool.compute(slices, baseline)
+
+    compute() flattens the slices into one close/volume/timestamp array set
+    plus per-ticker offsets and copies those once into shared memory; each
+    task is just the blocks' names and a (first, last) ticker range, and a
+    worker maps a call's blocks the first time it sees them. Results come
+    back in the original ticker order and equal a serial compute_metrics
+    loop. The worker processes start with the first compute() and serve
+    every later one until close(), so a run pays for them once, not per
+    batch; each call's blocks are freed when it returns.
+    """
+
+    def __init__(self, workers=None, shards_per_worker=4):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.shards_per_worker = shards_per_worker
+        self._shm = []
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _share(self, arrays):
+        spec = {}
+        for field, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            self._shm.append(shm)
+            spec[field] = (shm.name, arr.dtype.str, arr.shape)
+        return spec
+
+    def _release(self):
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+        self._shm = []
+
+    def close(self):
+        self._release()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def compute(self, slices, baseline) -> pd.DataFrame:
+        """
+        Given {ticker: df_slice}, a wide frame or a BarStore and a per-ticker baseline daily
+        volume (see screener.baseline_vector), returns one row per ticker
+        (pct_change, total_vol, avg_vol, rel_vol) indexed by ticker.
+        """
+        tickers, close, vol, idx, starts, ends = _segments(slices)
+        cols = ["pct_change", "total_vol", "avg_vol", "rel_vol"]
+        if not tickers:
+            return pd.DataFrame(columns=cols)
+        baseline = pd.Series(baseline, dtype="float64")
+        if hasattr(slices, "file"):
+            # a BarStore: workers map its files instead of getting a copy
+            files = {k: (slices.file(f), "npy", None) for k, f in
+                     (("close", "Close"), ("vol", "Volume"), ("stamps", "stamps"))}
+            bars = {}
+        else:
+            files = {}
+            bars = {"close": close, "vol": vol, "stamps": idx.astype("datetime64[ns]").view("int64")}
+        spec = files | self._share({
+            **bars,
+            "starts": starts, "ends": ends,
+            "baseline": baseline.reindex(tickers).to_numpy(),
+            "has_base": np.isin(tickers, baseline.index),
+        })
+        try:
+            n = len(tickers)
+            n_shards = min(n, self.workers * self.shards_per_worker)
+            bounds = np.linspace(0, n, n_shards + 1).astype(int)
+            rows = [None] * n
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_context())
+            for lo, part in self._pool.map(_metrics_shard, [spec] * n_shards, bounds[:-1], bounds[1:]):
+                rows[lo:lo + len(part)] = part
+        finally:
+            self._release()
+        return pd.DataFrame(rows, index=pd.Index(tickers, name="Ticker"), columns=cols)
+
+
+def compute_metrics_parallel(slices, baseline, workers=None) -> pd.DataFrame:
+    """
+    One-shot MetricPool(workers).compute(slices, baseline).
+    """
+    with MetricPool(workers) as pool:
+        return pool.compute(slices, baseline)
@@ -0,0 +1,273 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from scheduler import split_failed
+
+
+def _bars(df) -> int:
+    """
+    Ticker-bars with a Close in a wide (ticker, field) frame.
+    """
+    if df is None or df.empty:
+        return 0
+    if isinstance(df.columns, pd.MultiIndex):
+        close = np.flatnonzero(df.columns.get_level_values(1) == "Close")
+        return int((~np.isnan(df.iloc[:, close].to_numpy("float64"))).sum())
+    return int(df["Close"].notna().sum()) if "Close" in df.columns else 0
+
+
+def _has_bars(df) -> dict:
+    """
+    {ticker: any non-NaN value} for a wide (ticker, field) frame.
+    """
+    if df is None or df.empty or not isinstance(df.columns, pd.MultiIndex):
+        return {}
+    has = ~df.isna().to_numpy().all(axis=0)
+    return pd.Series(has).groupby(df.columns.get_level_values(0).to_numpy()).any().to_dict()
+
+
+def _rows(df, start, end):
+    """
+    Row positions of df's [start, end) stamps (a slice when sorted).
+    """
+    s, e = pd.Timestamp(start), pd.Timestamp(end)
+    tz = getattr(df.index, "tz", None)
+    if tz is not None and s.tz is None:
+        s, e = s.tz_localize(tz), e.tz_localize(tz)
+    if df.index.is_monotonic_increasing:
+        return slice(df.index.searchsorted(s, "left"), df.index.searchsorted(e, "left"))
+    return np.flatnonzero((df.index >= s) & (df.index < e))
+
+
+def _dense(df):
+    """
+    df as one float64 block: a yf frame holds a block per ticker, and cuts of
+    it keep paying for every block's bookkeeping.
+    """
+    if df.empty or not (df.dtypes == "float64").all():
+        return df
+    return pd.DataFrame(df.to_numpy("float64"), index=df.index, columns=df.columns)
+
+
+class _Need:
+    __slots__ = ("tickers", "start", "end", "interval", "prepost")
+
+    def __init__(self, tickers, start, end, interval, prepost):
+        self.tickers = list(tickers)
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.interval = interval
+        self.prepost = bool(prepost)
+
+
+class FetchPlan:
+    """
+    Every bar download of one run, planned before any is made.
+
+        plan = FetchPlan()
+        plan.need("baseline", tickers, lb_start, start, "1d", False)
+        plan.need(("day", 0), batch, start, end, "1d", False)
+        plan.fetch(download, scheduler)
+        df_baseline = plan.get("baseline")
+
+    Needs with the same interval/prepost whose [start, end) ranges overlap or
+    touch are merged into one request for the union of their tickers over
+    the union of their ranges, so run_screener's 90-day baseline and its
+    per-batch daily bars become a single daily download. get() serves each
+    need from its merged frame with the rows and tickers a direct download
+    would have returned. report() says how many requests and bars that
+    saved.
+
+    release(key, tickers) says a need's tickers were used up; a merged frame
+    is cut down to what its remaining needs still cover once that halves
+    it, and dropped when nothing is left, so a run doesn't hold the whole
+    universe's bars until its last batch.
+    """
+
+    def __init__(self):
+        self._needs = {}
+        self._requests = []   # [(_Need, [keys])]
+        self._frames = []
+        self._served = 0
+        self._fetched = 0
+        self._has = []
+        self._left = {}
+        self._lock = threading.Lock()
+
+    def need(self, key, tickers, start, end, interval, prepost=False):
+        self._needs[key] = _Need(tickers, start, end, interval, prepost)
+        self._requests = []
+
+    def requests(self) -> list:
+        """
+        The merged requests as (tickers, start, end, interval, prepost).
+        """
+        if not self._requests:
+            self._plan()
+        return [(r.tickers, r.start, r.end, r.interval, r.prepost) for r, _ in self._requests]
+
+    def _plan(self):
+        groups = {}
+        for key, need in self._needs.items():
+            groups.setdefault((need.interval, need.prepost), []).append(key)
+        self._requests = []
+        for keys in groups.values():
+            keys.sort(key=lambda k: self._needs[k].start)
+            merged, members = None, []
+            for k in keys:
+                n = self._needs[k]
+                if merged is not None and n.start <= merged.end:
+                    # overlapping or adjacent: grow the current request
+                    seen = set(merged.tickers)
+                    merged.tickers += [t for t in n.tickers if t not in seen]
+                    merged.end = max(merged.end, n.end)
+                    members.append(k)
+                    continue
+                if merged is not None:
+                    self._requests.append((merged, members))
+                merged = _Need(n.tickers, n.start, n.end, n.interval, n.prepost)
+                members = [k]
+            if merged is not None:
+                self._requests.append((merged, members))
+
+    def fetch(self, download, scheduler=None, on_error=None):
+        """
+        Issue the merged requests through download(tickers, start, end,
+        interval, prepost); with a FetchScheduler they overlap and are retried
+        like batch downloads. With on_error, a request that still fails is
+        split in halves (scheduler.split_failed, no more retries) down to the
+        single tickers that fail on their own; on_error(ticker, exc) is called
+        for each and the rest is kept. A request that fails as a whole raises
+        scheduler.RunFailed.
+        """
+        if not self._requests:
+            self._plan()
+        reqs = [r for r, _ in self._requests]
+
+        def one(req, tickers=None):
+            start, end = req.start, req.end
+            if req.interval == "1d":
+                start, end = start.date(), end.date()
+            return download(req.tickers if tickers is None else tickers, start, end, req.interval, req.prepost)
+
+        def or_split(req):
+            try:
+                if scheduler is not None:
+                    return scheduler.attempt(one, req)
+                return one(req)
+            except Exception as exc:
+                parts = [df for df in split_failed(lambda t: one(req, t), req.tickers, exc, on_error) if not df.empty]
+                return pd.concat(parts, axis=1) if parts else pd.DataFrame()
+
+        fetch_one = or_split if on_error is not None else one
+        if scheduler is not None:
+            self.use(df for _, df in scheduler.run(reqs, fetch_one))
+        else:
+            self.use(fetch_one(r) for r in reqs)
+        self._fetched = sum(_bars(df) for df in self._frames)
+        return self
+
+    @property
+    def frames(self) -> list:
+        """
+        The merged requests' frames, e.g. to checkpoint; see use().
+        """
+        return self._frames
+
+    def use(self, frames):
+        """
+        Take frames an earlier fetch() of the same plan returned instead of
+        downloading (nothing counts as fetched then).
+        """
+        if not self._requests:
+            self._plan()
+        self._frames = list(frames)
+        self._has = [_has_bars(df) for df in self._frames]
+        self._left = {key: set(need.tickers) for key, need in self._needs.items()}
+        self._fetched = 0
+        return self
+
+    def get(self, key, tickers=None) -> pd.DataFrame:
+        """
+        One need's bars cut from its merged frame: its tickers (or the given
+        subset of them), its [start, end) rows, rows without any of its
+        tickers dropped.
+        """
+        need = self._needs[key]
+        wanted = need.tickers if tickers is None else list(set(tickers) & set(need.tickers))
+        i = self._request_of(key)
+        df, has = self._frames[i], self._has[i]
+        if df is None or df.empty:
+            return pd.DataFrame()
+        rows = _rows(df, need.start, need.end)
+        if not isinstance(df.columns, pd.MultiIndex):
+            out = df.iloc[rows].dropna(how="all")
+            return out if not out.empty else pd.DataFrame()
+
+        cols = np.flatnonzero(df.columns.get_level_values(0).isin(wanted))
+        # every ticker and a row range: a view of the merged frame, no copy
+        out = df.iloc[rows] if len(cols) == df.shape[1] else df.iloc[rows, cols]
+        nan = out.isna().to_numpy()
+        keep_rows = ~nan.all(axis=1)
+        # tickers with bars elsewhere in the merged range but none in this
+        # one wouldn't have come back from a direct download either
+        tick = out.columns.get_level_values(0)
+        col_has = pd.Series(~nan[keep_rows].all(axis=0)).groupby(tick.to_numpy()).transform("any").to_numpy()
+        keep_cols = col_has | ~np.array([has.get(t, False) for t in tick], dtype=bool)
+        if not (keep_rows.all() and keep_cols.all()):
+            out = out.iloc[np.flatnonzero(keep_rows), np.flatnonzero(keep_cols)]
+        if out.empty:
+            return pd.DataFrame()
+        close = out.columns.get_level_values(1) == "Close"
+        served = int((~nan[keep_rows][:, keep_cols][:, close]).sum())
+        with self._lock:
+            self._served += served
+        return out
+
+    def _request_of(self, key) -> int:
+        for i, (_, members) in enumerate(self._requests):
+            if key in members and i < len(self._frames):
+                return i
+        raise KeyError(f"{key!r} was not fetched")
+
+    def release(self, key, tickers=None):
+        """
+        Done with `tickers` (default: all) of need `key`; their bars are
+        freed once no other need of the same request still covers them.
+        """
+        with self._lock:
+            i = self._request_of(key)
+            left = self._left.get(key, set())
+            left -= set(self._needs[key].tickers if tickers is None else tickers)
+            members = [m for m in self._requests[i][1] if self._left.get(m)]
+            df = self._frames[i]
+            if df is None or df.empty:
+                return
+            if not members:
+                self._frames[i] = pd.DataFrame()
+                return
+            rows = np.arange(len(df))[_rows(df, min(self._needs[m].start for m in members),
+                                             max(self._needs[m].end for m in members))]
+            cols = np.arange(df.shape[1])
+            if isinstance(df.columns, pd.MultiIndex):
+                still = set().union(*(self._left[m] for m in members))
+                cols = np.flatnonzero(df.columns.get_level_values(0).isin(still))
+            if 2 * len(rows) * len(cols) <= df.shape[0] * df.shape[1]:
+                # a copy of the live part; readers holding the old frame keep it
+                self._frames[i] = _dense(df.iloc[rows, cols])
+
+    def report(self) -> dict:
+        """
+        needs vs requests made, and ticker-bars handed out vs downloaded
+        (bars_saved > 0 when needs overlapped).
+        """
+        n_req = len(self._requests)
+        return {
+            "needs": len(self._needs),
+            "requests": n_req,
+            "requests_saved": len(self._needs) - n_req,
+            "bars_fetched": self._fetched,
+            "bars_served": self._served,
+            "bars_saved": self._served - self._fetched,
+        }
@@ -0,0 +1,149 @@
+import threading
+import time
+import pandas as pd
+
+
+class _Stage:
+    """
+    One timed stage of a run. Add frames to it to count rows and bytes.
+    """
+    __slots__ = ("name", "batch", "tickers", "rows", "bytes", "seconds")
+
+    def __init__(self, name, batch, tickers):
+        self.name = name
+        self.batch = batch
+        self.tickers = tickers
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def add(self, df):
+        if df is not None:
+            self.rows += len(df)
+            self.bytes += int(df.memory_usage(index=True, deep=False).sum())
+        return df
+
+    def count(self, rows=0, bytes=0):
+        self.rows += rows
+        self.bytes += bytes
+
+
+class _StageTimer:
+    def __init__(self, profile, stage):
+        self.profile = profile
+        self.stage = stage
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self.stage
+
+    def __exit__(self, *exc):
+        self.stage.seconds = time.perf_counter() - self._t0
+        self.profile._record(self.stage)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def add(self, df):
+        return df
+
+    def count(self, rows=0, bytes=0):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class RunProfile:
+    """
+    Structured timings and counters for one run_screener call.
+
+    Pass one in as run_screener(..., profile=RunProfile()) and read it after:
+      • stages:    one record per stage per batch (seconds, rows, bytes, tickers)
+      • summary(): the same rolled up per stage
+      • as_dict(): JSON-friendly version for logging
+
+    Stages are recorded from the fetch worker threads too, so a batch's
+    download and its metrics can overlap; fetch_wait is the time the metric
+    loop actually sat idle waiting for data.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages = []
+        self.meta = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name, batch=None, tickers=0):
+        return _StageTimer(self, _Stage(name, batch, tickers))
+
+    def _record(self, stage):
+        with self._lock:
+            self.stages.append(stage)
+
+    def iter(self, name, iterable):
+        """
+        Yield from `iterable`, recording how long each next() blocked as `name`.
+        """
+        it = iter(iterable)
+        batch = 0
+        while True:
+            with self.stage(name, batch=batch):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            batch += 1
+            yield item
+
+    def to_frame(self) -> pd.DataFrame:
+        cols = ["stage", "batch", "seconds", "rows", "bytes", "tickers"]
+        with self._lock:
+            rows = [(s.name, s.batch, s.seconds, s.rows, s.bytes, s.tickers) for s in self.stages]
+        return pd.DataFrame(rows, columns=cols)
+
+    def summary(self) -> pd.DataFrame:
+        df = self.to_frame()
+        if df.empty:
+            return df
+        out = df.groupby("stage", sort=False).agg(
+            calls=("seconds", "size"),
+            seconds=("seconds", "sum"),
+            max_seconds=("seconds", "max"),
+            rows=("rows", "sum"),
+            bytes=("bytes", "sum"),
+            tickers=("tickers", "sum"),
+        )
+        return out.round({"seconds": 4, "max_seconds": 4})
+
+    def as_dict(self) -> dict:
+        return {
+            "meta":    dict(self.meta),
+            "summary": self.summary().reset_index().to_dict("records"),
+            "stages":  self.to_frame().to_dict("records"),
+        }
+
+
+class NullProfile:
+    """
+    Drop-in RunProfile that records nothing; what run_screener uses by default.
+    """
+    enabled = False
+    meta = {}
+
+    def stage(self, name, batch=None, tickers=0):
+        return _NULL_STAGE
+
+    def iter(self, name, iterable):
+        return iterable
+
+
+NULL_PROFILE = NullProfile()
@@ -0,0 +1,201 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from datetime import time
+from compact import CompactBars
+from cache import check_tickers
+
+MARKET_OPEN  = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+PRE_OPEN     = time(4, 0)
+POST_CLOSE   = time(20, 0)
+SESSIONS     = ("pre", "regular", "post")
+
+
+def session_codes(index) -> np.ndarray:
+    """
+    Per bar: 0 pre-market [04:00, 09:30), 1 regular [09:30, 16:00),
+    2 post-market [16:00, 20:00), -1 outside all three. Uses exchange-local
+    wall-clock time, whatever the index tz.
+    """
+    index = pd.DatetimeIndex(index)
+    mins = index.hour * 60 + index.minute
+    edges = [t.hour * 60 + t.minute for t in (PRE_OPEN, MARKET_OPEN, MARKET_CLOSE, POST_CLOSE)]
+    codes = np.searchsorted(edges, np.asarray(mins), side="right").astype("int8") - 1
+    codes[codes == 3] = -1
+    return codes
+
+
+def tag_sessions(index) -> pd.Categorical:
+    """
+    session_codes() as a "pre" / "regular" / "post" categorical (NaN outside).
+    """
+    return pd.Categorical.from_codes(session_codes(index), categories=list(SESSIONS))
+
+
+class YFinanceProvider:
+    """
+    Bars straight from Yahoo via yf.download(..., group_by='ticker').
+    """
+
+    def download(self, tickers, start, end, interval, prepost):
+        return yf.download(
+            tickers=tickers,
+            start=start,
+            end=end,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=False,
+            threads=False,
+            progress=False,
+            prepost=prepost
+        )
+
+
+def _parse_export_slow(stamps: pd.Series) -> pd.DatetimeIndex:
+    """
+    pandas' own parser for stamps that don't fit the fixed-width layout.
+    """
+    stamps = stamps.astype(str).str.strip()
+    suffix = stamps.str[-2:].str.upper()
+    dt = pd.to_datetime(stamps.str[:-2].str.strip(), format="%m/%d/%Y %H:%M")
+    hour = dt.dt.hour
+    shift = np.where((suffix == "PM") & (hour < 12), 12, 0) - np.where((suffix == "AM") & (hour == 12), 12, 0)
+    return pd.DatetimeIndex(dt + pd.to_timedelta(shift, unit="h"))
+
+
+def parse_export_timestamps(stamps: pd.Series) -> pd.DatetimeIndex:
+    """
+    Parse `MM/DD/YYYY hh:mm AM/PM` stamps as written in filters/export.csv.
+    Vendors mix 12h and 24h clocks ("07:58 PM" and "19:58 PM"), so the suffix
+    only counts when the hour is 12 or less.
+
+    The fields sit at fixed byte offsets, so the whole column is read as one
+    (rows, 19) uint8 matrix and turned into datetime64 with integer math —
+    no per-row strptime. Rows that don't fit that layout (short fields,
+    stray spaces) go through pandas' parser instead.
+    """
+    raw = np.asarray(stamps, dtype=object)
+    n = len(raw)
+    if n == 0:
+        return pd.DatetimeIndex([], dtype="datetime64[ns]")
+    try:
+        b = np.asarray(raw, dtype="S19").view(np.uint8).reshape(n, 19)
+    except (UnicodeEncodeError, ValueError, TypeError):
+        return _parse_export_slow(pd.Series(raw))
+    d = b.astype(np.int64) - ord("0")
+    month = d[:, 0] * 10 + d[:, 1]
+    day   = d[:, 3] * 10 + d[:, 4]
+    year  = d[:, 6] * 1000 + d[:, 7] * 100 + d[:, 8] * 10 + d[:, 9]
+    hour  = d[:, 11] * 10 + d[:, 12]
+    mins  = d[:, 14] * 10 + d[:, 15]
+    ampm  = b[:, 17] | 0x20  # lower-case 'a' / 'p'
+
+    digits = d[:, [0, 1, 3, 4, 6, 7, 8, 9, 11, 12, 14, 15]]
+    ok = ((digits >= 0) & (digits <= 9)).all(axis=1)
+    ok &= (b[:, 2] == ord("/")) & (b[:, 5] == ord("/")) & (b[:, 10] == ord(" "))
+    ok &= (b[:, 13] == ord(":")) & (b[:, 16] == ord(" ")) & ((b[:, 18] | 0x20) == ord("m"))
+    ok &= (ampm == ord("a")) | (ampm == ord("p"))
+    ok &= (month >= 1) & (month <= 12) & (day >= 1) & (hour <= 23) & (mins <= 59)
+
+    months = np.where(ok, (year - 1970) * 12 + month - 1, 0).astype("datetime64[M]")
+    days = months.astype("datetime64[D]") + np.where(ok, day - 1, 0).astype("timedelta64[D]")
+    ok &= days.astype("datetime64[M]") == months  # 02/31 and friends
+    hour = hour + np.where((ampm == ord("p")) & (hour < 12), 12, 0) - np.where((ampm == ord("a")) & (hour == 12), 12, 0)
+    out = days.astype("datetime64[ns]") + (hour * 60 + mins).astype("timedelta64[m]")
+
+    if not ok.all():
+        bad = ~ok
+        out[bad] = _parse_export_slow(pd.Series(raw[bad])).to_numpy("datetime64[ns]")
+    return pd.DatetimeIndex(out)
+
+
+def read_export_csv(path) -> pd.DataFrame:
+    """
+    One export.csv-style file (Date,Open,High,Low,Close,Volume) → OHLCV frame
+    indexed by naive exchange-local timestamps.
+    """
+    raw = pd.read_csv(path, dtype={"Date": object})
+    df = raw[["Open", "High", "Low", "Close", "Volume"]].astype("float64")
+    df.index = parse_export_timestamps(raw["Date"])
+    return df
+
+
+class LocalProvider:
+    """
+    Offline bars from a directory tree of export.csv-style files:
+
+        root/<TICKER>/*.csv     1-minute bars, any number of files per ticker
+
+    Minute files are resampled to the requested interval ("2m", "1d", ...), so
+    the screener sees the same layout as from YFinanceProvider: intraday stamps
+    localized to `tz`, daily bars on naive dates, regular session only unless
+    prepost is set.
+    """
+
+    def __init__(self, root, tz="America/New_York"):
+        self.root = root
+        self.tz = tz
+        self._bars = {}
+
+    def _load(self, ticker):
+        if ticker not in self._bars:
+            check_tickers([ticker])   # a directory name under root, nothing else
+            files = sorted(glob.glob(os.path.join(self.root, ticker, "*.csv")))
+            if files:
+                df = pd.concat([read_export_csv(f) for f in files]).sort_index()
+                df = df[~df.index.duplicated(keep="last")]
+            else:
+                df = pd.DataFrame()
+            self._bars[ticker] = df
+        return self._bars[ticker]
+
+    def _bars_for(self, ticker, start, end, interval, prepost):
+        df = self._load(ticker)
+        if df.empty:
+            return df
+        s, e = pd.Timestamp(start), pd.Timestamp(end)
+
+        if interval == "1d":
+            reg = df.between_time(MARKET_OPEN, MARKET_CLOSE, inclusive="left")
+            day = reg.resample("1D").agg(
+                {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+            ).dropna(subset=["Close"])
+            day.insert(4, "Adj Close", day["Close"])
+            day.index.name = "Date"
+            return day.loc[(day.index >= s.normalize()) & (day.index < e)]
+
+        out = df if prepost else df.between_time(MARKET_OPEN, MARKET_CLOSE, inclusive="left")
+        if interval != "1m":
+            out = out.resample(interval.replace("m", "min")).agg(
+                {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+            ).dropna(subset=["Close"])
+        out = out.loc[(out.index >= s) & (out.index < e)].copy()
+        out.insert(4, "Adj Close", out["Close"])
+        out.index = out.index.tz_localize(self.tz)
+        out.index.name = "Datetime"
+        return out
+
+    def _frames(self, tickers, start, end, interval, prepost):
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        frames = {}
+        for t in tickers:
+            tdf = self._bars_for(t, start, end, interval, prepost)
+            if not tdf.empty:
+                frames[t] = tdf
+        return frames
+
+    def download(self, tickers, start, end, interval, prepost):
+        frames = self._frames(tickers, start, end, interval, prepost)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    def download_compact(self, tickers, start, end, interval, prepost):
+        """
+        Same bars as download(), as compact.CompactBars (no wide float64 frame).
+        """
+        return CompactBars.from_frames(self._frames(tickers, start, end, interval, prepost))
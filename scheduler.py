@@ -0,0 +1,171 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_SPLIT_DEPTH = 14  # halvings before a failing part's tickers are dropped together (2**14 = 16384)
+PROBES = 3            # single tickers tried when both halves of a failed batch fail too
+
+
+class RunFailed(RuntimeError):
+    """
+    A request failed as a whole (provider down, bad window, ...) rather than
+    on a few bad tickers, so the run stops instead of quarantining everything.
+    """
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate seconds apart across every thread that shares it.
+    rate=None means no limit.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class FetchScheduler:
+    """
+    Overlaps batch downloads for run_screener.
+
+      • max_workers: how many batches are downloaded at once
+      • rate:        max provider requests per second (one limiter per provider)
+      • retries:     extra attempts for a batch whose fetch raised
+      • backoff:     seconds before the first retry, doubled each time
+
+    run() keeps up to max_workers batches in flight ahead of the caller, so while
+    the metrics for batch N are computed, batch N+1.. are already downloading.
+    """
+
+    def __init__(self, max_workers=4, rate=4.0, retries=2, backoff=1.0):
+        self.max_workers = max(1, int(max_workers))
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, provider) -> RateLimiter:
+        with self._lock:
+            key = id(provider)
+            if key not in self._limiters:
+                self._limiters[key] = RateLimiter(self.rate)
+            return self._limiters[key]
+
+    def limited(self, provider, method="download"):
+        """
+        provider.download (or another fetch method) wrapped so every call waits
+        for the provider's rate limit.
+        """
+        limiter = self.limiter(provider)
+        fetch = getattr(provider, method)
+
+        def download(tickers, start, end, interval, prepost):
+            limiter.wait()
+            return fetch(tickers, start, end, interval, prepost)
+        return download
+
+    def attempt(self, fetch, batch):
+        """
+        fetch(batch) with the scheduler's retries and exponential backoff.
+        """
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                return fetch(batch)
+            except RunFailed:
+                raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def run(self, batches, fetch):
+        """
+        Yield (batch, fetch(batch)) in the original batch order.
+        A batch that still fails after all retries raises here. `batches` is
+        read lazily, max_workers ahead of the caller, so a generator can size
+        later batches from earlier results.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = deque()
+            it = iter(batches)
+            for batch in it:
+                pending.append((batch, pool.submit(self.attempt, fetch, batch)))
+                if len(pending) >= self.max_workers:
+                    break
+            while pending:
+                batch, fut = pending.popleft()
+                result = fut.result()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append((nxt, pool.submit(self.attempt, fetch, nxt)))
+                yield batch, result
+
+
+def split_failed(run, batch, error, on_error, max_depth=MAX_SPLIT_DEPTH) -> list:
+    """
+    For a batch whose request already failed with `error` (after the
+    scheduler's retries): run(tickers) once per half, without retries,
+    halving the parts that fail again down to the single tickers that fail
+    on their own. Returns the working parts' results in batch order; the
+    failing tickers go to on_error(ticker, exc).
+
+    Raises RunFailed instead, without calling on_error, when it doesn't look
+    like a few bad tickers:
+      • both halves of the first split fail too and so does each of PROBES
+        single tickers spread over the batch (bad tickers in both halves
+        alone don't stop the run), or
+      • more than half of the batch's tickers end up failing.
+    A part still failing after max_depth halvings fails all its tickers.
+    """
+    batch = list(batch)
+    out, failed = [], []
+
+    def probe(part):
+        for i in sorted({round(k * (len(part) - 1) / max(PROBES - 1, 1)) for k in range(PROBES)}):
+            try:
+                run(part[i:i + 1])
+                return True
+            except Exception:
+                pass
+        return False
+
+    def split(part, exc, depth):
+        if len(part) == 1 or depth >= max_depth:
+            failed.extend((t, exc) for t in part)
+            return
+        half = len(part) // 2
+        tried = []
+        for sub in (part[:half], part[half:]):
+            try:
+                tried.append((sub, run(sub), None))
+            except Exception as sub_exc:
+                tried.append((sub, None, sub_exc))
+        if depth == 0 and all(e is not None for _, _, e in tried) and not probe(part):
+            raise RunFailed(f"all {len(batch)} tickers failed, not just some: {exc}") from exc
+        for sub, result, sub_exc in tried:
+            if sub_exc is None:
+                out.append(result)
+            else:
+                split(sub, sub_exc, depth + 1)
+
+    split(batch, error, 0)
+    if len(batch) > 1 and 2 * len(failed) > len(batch):
+        raise RunFailed(f"{len(failed)} of {len(batch)} tickers failed: {failed[0][1]}") from failed[0][1]
+    for ticker, exc in failed:
+        on_error(ticker, exc)
+    return out
@@ -1,7 +1,16 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta, time
+from time import perf_counter
 from millify import millify as mf
+from providers import YFinanceProvider
+from scheduler import FetchScheduler, split_failed
+from engine import intraday_table, day_stats, session_stats, session_table
+from compact import CompactBars
+from profiling import NULL_PROFILE
+from window_index import WindowIndex
+from parallel import MetricPool, MIN_SHARDED
+from planner import FetchPlan
+from batching import BATCH, bars_size
 
 def slice_window(df_intraday: pd.DataFrame, ticker: str, start_dt: datetime, end_dt: datetime) -> pd.DataFrame:
     """
@@ -11,7 +20,13 @@ def slice_window(df_intraday: pd.DataFrame, ticker: str, start_dt: datetime, end
     if df_intraday.empty or ticker not in df_intraday.columns:
         return pd.DataFrame()
     ser = df_intraday[ticker]
-    sliced = ser.loc[(ser.index >= start_dt) & (ser.index <= end_dt)]
+    if ser.index.is_monotonic_increasing:
+        # sorted bars: two binary searches and a view instead of a mask over every bar
+        lo = ser.index.searchsorted(start_dt, side="left")
+        hi = ser.index.searchsorted(end_dt, side="right")
+        sliced = ser.iloc[lo:max(hi, lo)]
+    else:
+        sliced = ser.loc[(ser.index >= start_dt) & (ser.index <= end_dt)]
     # print(f"[slice_window] {ticker} → slicing {start_dt}–{end_dt}:")
     # print("   → returned timestamps:", sliced.index[ [0, -1] ] if not sliced.empty else "EMPTY")
     return sliced
@@ -86,97 +101,174 @@ def compute_metrics(df_slice: pd.DataFrame, df_daily_baseline: pd.DataFrame) ->
         "rel_vol":    round(rel_vol, 2)
     }
 
-def run_screener(tickers, interval, start, end, num_days, prepost):
-    passed = []
+def baseline_vector(df_baseline: pd.DataFrame, tickers) -> pd.Series:
+    """
+    Mean daily volume per ticker from a wide 90d baseline frame, ready to pass
+    to compute_metrics_many. Tickers missing from the frame are left out.
+    """
+    if df_baseline.empty or not isinstance(df_baseline.columns, pd.MultiIndex):
+        return pd.Series(dtype="float64")
+    vols = df_baseline.xs("Volume", axis=1, level=1)
+    return vols.mean().reindex([t for t in tickers if t in vols.columns])
+
+def compute_metrics_many(slices, baseline, bar_minutes="auto") -> pd.DataFrame:
+    """
+    Batched compute_metrics for many tickers at once.
+
+    Given:
+      • slices:      {ticker: df_slice} (e.g. from slice_window) or one wide
+                     yf-style (ticker, field) frame already cut to the window.
+      • baseline:    precomputed baseline daily volume per ticker (Series/dict,
+                     see baseline_vector). Missing tickers fall back to the
+                     slice's own avg_vol, like an empty baseline frame does.
+      • bar_minutes: bar size of the whole batch; "auto" detects it once from
+                     the first slice with 2+ bars, None means daily bars.
 
-    # 1) Pull 90-day daily baseline for all tickers
+    Returns a DataFrame indexed by ticker with pct_change, total_vol, avg_vol and
+    rel_vol, matching compute_metrics slice for slice. Unlike compute_metrics,
+    bar frequency and bars-per-day are decided once for the batch rather than
+    from each slice's own first two bars.
+    """
+    return WindowIndex(slices, bar_minutes).full(baseline)
+
+def _download(provider, tickers, start, end, interval, prepost, cache=None, scheduler=None):
+    """
+    Every bar request in run_screener goes through here. With a BarCache the
+    days already on disk are reused and only the gaps hit the provider; with a
+    FetchScheduler each provider call waits for its rate limit.
+    """
+    fetch = scheduler.limited(provider) if scheduler is not None else provider.download
+    if cache is not None:
+        return cache.fetch(tickers, start, end, interval, prepost, fetch)
+    return fetch(tickers, start, end, interval, prepost)
+
+def _download_compact(provider, tickers, start, end, interval, prepost, cache=None, scheduler=None):
+    """
+    Minute bars as compact.CompactBars. Providers with download_compact build
+    them without the wide float64 frame; anything else (or a cached run) is
+    downloaded as usual and converted right away.
+    """
+    if cache is None and hasattr(provider, "download_compact"):
+        fetch = scheduler.limited(provider, "download_compact") if scheduler is not None else provider.download_compact
+        return fetch(tickers, start, end, interval, prepost)
+    return CompactBars.from_wide(_download(provider, tickers, start, end, interval, prepost, cache, scheduler))
+
+def _screen_batches(tickers, interval, start, end, prepost, cache, provider, scheduler, profile, compact,
+                    workers=None, checkpoint=None, batcher=None, sessions=False, daily_store=None):
+    """
+    The screener itself, one batch at a time. Yields a list of row dicts per
+    batch for daily-only windows, an intraday result table otherwise. Each
+    batch's raw bar frames are released as soon as its metrics are done.
+
+    A batch whose download (after the scheduler's retries) or metrics fail
+    is split in halves, each fetched once more and screened again, down to
+    the single tickers that still fail; those are quarantined and left out
+    instead of failing the run. When the whole batch fails rather than a few
+    tickers (see scheduler.split_failed) the run raises scheduler.RunFailed
+    and nothing is quarantined.
+    """
+    provider  = provider or YFinanceProvider()
+    scheduler = scheduler or FetchScheduler()
+    profile   = profile or NULL_PROFILE
+    if profile.enabled:
+        profile.meta.update(tickers=len(tickers), interval=interval, start=str(start), end=str(end))
+    t_run = perf_counter()
+    daily_only = start.time()==time(16,0) and end.time()==time(16,0)
+    rows_out = 0
+    if daily_store is not None and daily_store.serves(tickers, start, end):
+        # the nightly store already holds every bar and running total the
+        # window needs: no downloads, the rows are a lookup
+        with profile.stage("daily_store", tickers=len(tickers)) as st:
+            passed = daily_store.screen(tickers, start, end)
+            st.count(len(passed))
+        for i in range(0, len(passed), BATCH):
+            yield passed[i:i + BATCH]
+        if profile.enabled:
+            profile.meta.update(batches=-(-len(passed) // BATCH), rows_out=len(passed),
+                                seconds=round(perf_counter() - t_run, 4), daily_store=daily_store.path)
+        return
+    if batcher is not None:
+        batcher.reset(interval, start, end, prepost, scheduler.max_workers)
+
+    # 1) Plan the daily bars: the 90-day baseline and the window days of all
+    #    tickers are adjacent ranges, fetched as one request; each batch
+    #    takes its tickers' share of the window days
     lb_start = (start - pd.Timedelta(days=90)).date()
     lb_end   = (start - pd.Timedelta(days=1)).date()
-    df_baseline = yf.download(
-        tickers,
-        start=lb_start,
-        end=(lb_end + timedelta(days=1)),
-        interval="1d",
-        group_by="ticker",
-        auto_adjust=False,
-        threads=False,
-        progress=False,
-        prepost=False
-    )
-
-    # 2) Process in batches of 200
-    for i in range(0, len(tickers), 200):
-        batch = tickers[i:i+200]
+    if checkpoint is not None and (checkpoint.compact, checkpoint.sessions) != (bool(compact), bool(sessions)):
+        raise ValueError(f"checkpoint {checkpoint.path} is for compact={checkpoint.compact}, "
+                         f"sessions={checkpoint.sessions}, not compact={bool(compact)}, sessions={bool(sessions)}")
+    quarantined = checkpoint.quarantined if checkpoint is not None else {}
 
+    # one process pool for the whole run, started by the first batch big
+    # enough to shard (see metrics_for) and shut down when the run ends
+    pool = None
+
+    def quarantine(ticker, exc):
+        if checkpoint is not None:
+            checkpoint.quarantine(ticker, exc)
+        else:
+            quarantined[ticker] = str(exc)[:500]
+
+    plan = FetchPlan()
+    plan.need("baseline", tickers, lb_start, lb_end + timedelta(days=1), "1d", False)
+    plan.need("days", tickers, start.date(), end.date() + timedelta(days=1), "1d", False)
+    with profile.stage("planned_download", tickers=len(tickers)) as st:
+        frames = checkpoint.plan_frames() if checkpoint is not None else None
+        if frames is not None:
+            plan.use(frames)
+        else:
+            plan.fetch(lambda *req: _download(provider, *req, cache, scheduler), scheduler, quarantine)
+            if checkpoint is not None:
+                checkpoint.save_plan_frames(plan.frames)
+        df_baseline = st.add(plan.get("baseline"))
+        plan.release("baseline")
+
+    def fetch_batch(numbered):
+        n, batch = numbered
         # — Daily-only if both times are market close
-        if start.time()==time(16,0) and end.time()==time(16,0):
-            df_daily = yf.download(
-                tickers=batch,
-                start=start.date(),
-                end=(end.date()+timedelta(days=1)),
-                interval="1d",
-                group_by="ticker",
-                auto_adjust=False,
-                threads=False,
-                progress=False,
-                prepost=False
-            )
-
-            for ticker in batch:
-                print(ticker)
-                sym = ticker.replace("-",".")
-                # slice the daily DF
-                df_slice = df_daily[sym] if sym in df_daily.columns else pd.DataFrame()
-                df_bl    = df_baseline[sym] if sym in df_baseline.columns else pd.DataFrame()
-                metrics  = compute_metrics(df_slice, df_bl)
-
-                passed.append({
-                    "Ticker":            sym,
-                    "Price":             round(df_slice["Close"].iloc[-1],2) if not df_slice.empty else None,
-                    "PC (%)":            metrics["pct_change"],
-                    "Total Volume":      metrics["total_vol"],
-                    "Average Volume":    metrics["avg_vol"],
-                    "Relative Volume":   metrics["rel_vol"]
-                })
+        if daily_only:
+            with profile.stage("daily_download", n, len(batch)) as st:
+                df_daily = st.add(plan.get("days", batch))
+            return {"daily": df_daily}
 
-        # — Intraday mix otherwise
+        if compact:
+            # float32/uint32 arrays + a row mask instead of copied float64 frames
+            with profile.stage("minute_download", n, len(batch)) as st:
+                df_min = _download_compact(provider, batch, start, end, interval, prepost, cache, scheduler)
+                st.count(df_min.n_rows, df_min.nbytes())
+            if sessions:
+                with profile.stage("session_metrics", n, len(batch)) as st:
+                    by_session = session_stats(df_min, [t.replace("-", ".") for t in batch])
+                    st.count(df_min.n_rows)
+            with profile.stage("tz_convert_between_time", n, len(batch)) as st:
+                df_min = df_min.between_time(time(9,30), time(16,0))
+                st.count(df_min.n_rows)
         else:
             # >>> ADD unified minute‐bar fetch for this batch
-            df_min = yf.download(
-                tickers=batch,
-                start=start,
-                end=end,
-                interval=interval,          # "1m" or "2m"
-                group_by="ticker",
-                auto_adjust=False,
-                threads=False,
-                progress=False,
-                prepost=prepost
-            )
-
-            if hasattr(df_min.index, "tz") and df_min.index.tz is not None:
-                 df_min.index = df_min.index.tz_convert(None)
-            # restrict to market hours
-            if not df_min.empty and isinstance(df_min.index, pd.DatetimeIndex):
-                # make sure it's datetime
-                df_min.index = pd.to_datetime(df_min.index)
-                df_min = df_min.between_time(time(9,30), time(16,0))
-            
-            
-            # >>> ADD daily‐bar fetch for this batch
-            df_day = yf.download(
-                tickers=batch,
-                start=start.date(),
-                end=(end.date() + timedelta(days=1)),
-                interval="1d",
-                group_by="ticker",
-                auto_adjust=False,
-                threads=False,
-                progress=False,
-                prepost=False
-            )
-
-            
+            with profile.stage("minute_download", n, len(batch)) as st:
+                df_min = st.add(_download(provider, batch, start, end, interval, prepost, cache, scheduler))   # "1m" or "2m"
+            if sessions:
+                # tag pre/regular/post while the stamps are still exchange-local
+                with profile.stage("session_metrics", n, len(batch)) as st:
+                    by_session = session_stats(df_min, [t.replace("-", ".") for t in batch])
+                    st.count(len(df_min))
+
+            with profile.stage("tz_convert_between_time", n, len(batch)) as st:
+                if hasattr(df_min.index, "tz") and df_min.index.tz is not None:
+                     df_min.index = df_min.index.tz_convert(None)
+                # restrict to market hours
+                if not df_min.empty and isinstance(df_min.index, pd.DatetimeIndex):
+                    # make sure it's datetime
+                    df_min.index = pd.to_datetime(df_min.index)
+                    df_min = df_min.between_time(time(9,30), time(16,0))
+                st.add(df_min)
+        
+        # >>> ADD daily‐bar fetch for this batch
+        with profile.stage("daily_download", n, len(batch)) as st:
+            df_day = st.add(plan.get("days", batch))
+
+        with profile.stage("daily_date_filter", n, len(batch)) as st:
             if start.time() != time(16, 0):
                 df_day = df_day[df_day.index.date >= start.date()]
             if end.time() != time(16,0):
@@ -189,65 +281,203 @@ def run_screener(tickers, interval, start, end, num_days, prepost):
             #     print("[download daily] got back an EMPTY dataframe")
             if hasattr(df_day.index, "tz") and df_day.index.tz is not None:
                  df_day.index = df_day.index.tz_convert(None)
-            
-            # now loop each ticker once
-            for ticker in batch:
-                sym = ticker.replace("-", ".")
-                
-                # minute‐bars for this ticker
-                if sym in df_min.columns and not df_min.empty:
-                    mins = df_min[sym]["Volume"].fillna(0)
-                    total_min = int(mins.sum())
-                    avg_min   = float(mins.mean())
-                else:
-                    total_min = avg_min = 0.0
-                
-                # daily bars for this ticker
-                if sym in df_day.columns:
-                    days = df_day[sym]["Volume"].fillna(0)
-                    if len(days)>1:
-                        first_vol = days.iloc[0]
-                        total_day = int(days.sum() - first_vol)
-                        avg_day   = total_day/(len(days)-1)
+            st.add(df_day)
+        bars = {"min": df_min, "day": df_day}
+        if sessions:
+            bars["sessions"] = by_session
+        return bars
+
+    def fetch_saved(numbered):
+        # bars a previous attempt already downloaded are read back from the
+        # checkpoint; a batch that keeps failing comes back as its error
+        n, batch = numbered
+        batch = [t for t in batch if t not in quarantined]
+        if not batch:
+            return {}
+        bars = checkpoint.bars(n, batch) if checkpoint is not None else None
+        if bars is None:
+            t0 = perf_counter()
+            try:
+                bars = scheduler.attempt(fetch_batch, (n, batch))
+            except Exception as exc:
+                return {"error": exc}
+            if batcher is not None:
+                batcher.observe(len(batch), perf_counter() - t0, *bars_size(bars))
+            if checkpoint is not None:
+                checkpoint.save_bars(n, batch, bars)
+        return bars
+
+    def metrics_for(n, batch, bars):
+        nonlocal pool
+        if daily_only:
+            df_daily = bars["daily"]
+            passed = []
+
+            with profile.stage("metrics", n, len(batch)) as st:
+                syms = [ticker.replace("-",".") for ticker in batch]
+                slices = {sym: df_daily[sym] if sym in df_daily.columns else pd.DataFrame() for sym in syms}
+                sharded = bool(workers and workers > 1 and len(syms) >= MIN_SHARDED)
+                if sharded:
+                    # shard the per-ticker compute_metrics calls over processes (see parallel.py)
+                    if pool is None:
+                        pool = MetricPool(workers)
+                    many = pool.compute(slices, baseline_vector(df_baseline, syms)).to_dict("index")
+                for ticker, sym in zip(batch, syms):
+                    df_slice = slices[sym]
+                    if sharded:
+                        metrics = many[sym]
                     else:
-                        total_day = int(days.sum())
-                        avg_day   = float(total_day)
-                else:
-                    total_day = avg_day = 0.0
-                
-                # baseline from your 90d df_baseline
-                baseline_daily_avg = (
-                    df_baseline[sym]["Volume"].mean()
-                    if sym in df_baseline.columns else avg_day
-                )
-                
-                # relative vol calculations
-                bars_per_day = 390.0 / (2.0 if interval == "2m" else 1.0)
-                rvol_min = avg_min / (baseline_daily_avg/bars_per_day) if baseline_daily_avg else 0
-                rvol_day = avg_day / baseline_daily_avg        if baseline_daily_avg else 0
-                # print("RVOL: ", rvol_day)
-                
-                # price change over the full window
-                if sym in df_day.columns:
-                    first_o = df_day[sym]["Close"].iloc[0]
-                    last_c  = df_day[sym]["Close"].iloc[-1]
-                elif sym in df_min.columns:
-                    first_o = df_min[sym]["Close"].iloc[0]
-                    last_c  = df_min[sym]["Close"].iloc[-1]
-                else:
-                    first_o = last_c = None
-                pct = ((last_c-first_o)/first_o*100) if first_o else 0
-                
-                passed.append({
-                    "Ticker":        sym,
-                    "Price":         round(last_c,2) if last_c else None,
-                    "PC (%)":        round(pct,2),
-                    "Min Total Vol": total_min,
-                    "Avg Vol/Min":   avg_min,
-                    "RVol (min)":    round(rvol_min,2),
-                    "Day Total Vol": total_day,
-                    "Avg Vol/Day":   avg_day,
-                    "RVol (day)":    round(rvol_day,2)
-                })
+                        print(ticker)
+                        df_bl   = df_baseline[sym] if sym in df_baseline.columns else pd.DataFrame()
+                        metrics = compute_metrics(df_slice, df_bl)
+
+                    passed.append({
+                        "Ticker":            sym,
+                        "Price":             round(df_slice["Close"].iloc[-1],2) if not df_slice.empty else None,
+                        "PC (%)":            metrics["pct_change"],
+                        "Total Volume":      metrics["total_vol"],
+                        "Average Volume":    metrics["avg_vol"],
+                        "Relative Volume":   metrics["rel_vol"]
+                    })
+                st.count(len(df_daily))
+            del df_daily
+            return passed
+
+        # — Intraday mix otherwise
+        else:
+            df_min, df_day = bars["min"], bars["day"]
+
+            # whole batch at once — see engine.intraday_table
+            with profile.stage("metrics", n, len(batch)) as st:
+                passed = intraday_table(df_min, df_day, df_baseline, batch, interval)
+                if sessions:
+                    syms = [t.replace("-", ".") for t in batch]
+                    baseline = day_stats(df_day, df_baseline, syms)["baseline"]
+                    passed = pd.concat([passed, session_table(bars["sessions"], baseline, interval)], axis=1)
+                st.count(len(df_min))
+            del df_min, df_day
+            return passed
+
+    def screen(n, batch, bars):
+        # metrics for the batch; one that fails is split around the tickers
+        # that fail on their own, a batch that fails as a whole stops the run
+        if not batch:
+            return []
+        try:
+            if "error" in bars:
+                raise bars["error"]
+            return metrics_for(n, batch, bars)
+        except Exception as exc:
+            error = exc
+        finally:
+            bars.clear()
+        parts = split_failed(lambda part: metrics_for(n, part, fetch_batch((n, part))), batch, error, quarantine)
+        tables = [p for p in parts if isinstance(p, pd.DataFrame)]
+        if tables:
+            return pd.concat(tables, ignore_index=True)
+        return [row for p in parts for row in p]
+
+    # 2) Process in batches (200 tickers, or sized by the batcher) —
+    #    downloads overlap, metrics run in batch order. Batches a checkpoint
+    #    already holds are read back and the rest continue after them
+    n, pos = 0, 0
+    while checkpoint is not None:
+        saved = checkpoint.batch(n)
+        if saved is None:
+            break
+        batch, passed = saved
+        plan.release("days", batch)
+        rows_out += len(passed)
+        yield passed
+        n, pos = n + 1, pos + len(batch)
+    n_batches = n
+
+    def numbered(n, pos):
+        while pos < len(tickers):
+            batch = tickers[pos:pos + (batcher.size() if batcher is not None else BATCH)]
+            yield n, batch
+            n, pos = n + 1, pos + len(batch)
+
+    try:
+        for (n, batch), bars in profile.iter("fetch_wait", scheduler.run(numbered(n, pos), fetch_saved)):
+            passed = screen(n, [t for t in batch if t not in quarantined], bars)
+            # the batch's share of the planned daily frame isn't needed any more
+            plan.release("days", batch)
+            if checkpoint is not None:
+                checkpoint.save_batch(n, batch, passed)
+            rows_out += len(passed)
+            n_batches = n + 1
+            yield passed
+    finally:
+        if pool is not None:
+            pool.close()
+
+    if checkpoint is not None:
+        checkpoint.finish(n_batches)
+    if profile.enabled:
+        profile.meta.update(batches=n_batches, rows_out=rows_out, seconds=round(perf_counter() - t_run, 4),
+                            fetch_plan=plan.report(), quarantined=dict(quarantined))
+
+def iter_screener(tickers, interval, start, end, num_days, prepost, cache=None, provider=None,
+                  scheduler=None, profile=None, compact=False, workers=None, checkpoint=None, batcher=None,
+                  sessions=False, daily_store=None):
+    """
+    Streaming run_screener: same arguments, but yields one result DataFrame per
+    batch (200 tickers unless a batcher sizes them) as soon as it is computed, so callers can render
+    progressively instead of waiting for the whole universe.
+    """
+    for rows in _screen_batches(tickers, interval, start, end, prepost, cache, provider, scheduler, profile, compact,
+                                workers, checkpoint, batcher, sessions, daily_store):
+        yield rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+
+def run_screener(tickers, interval, start, end, num_days, prepost, cache=None, provider=None,
+                 scheduler=None, profile=None, compact=False, workers=None, checkpoint=None, batcher=None,
+                 sessions=False, daily_store=None):
+    """
+    Screen `tickers` over [start → end].
+      • cache:     a cache.BarCache to reuse bars downloaded by earlier runs
+      • provider:  where bars come from (providers.YFinanceProvider by default,
+                   providers.LocalProvider for offline/replay runs)
+      • scheduler: a scheduler.FetchScheduler controlling how many batches are
+                   downloaded at once, the request rate and retries
+      • profile:   a profiling.RunProfile to fill with per-stage, per-batch
+                   timings and row/byte/ticker counts (off by default)
+      • compact:   keep minute bars as compact.CompactBars (float32 prices,
+                   integer volumes, copy-free session filter) to cut memory
+                   on large universes
+      • workers:   processes for the per-ticker metrics of daily-only windows
+                   (parallel.MetricPool, bars shared through shared memory,
+                   one pool for the whole run); batches under
+                   parallel.MIN_SHARDED tickers stay serial, and intraday
+                   batches are already one vectorized pass
+      • checkpoint: a checkpoint.RunCheckpoint made with the same compact /
+                   sessions flags; finished batches and
+                   downloaded bars are saved to its run directory and a
+                   rerun resumes after the last finished batch. Tickers
+                   that fail on their own are quarantined there (without
+                   one, in profile.meta["quarantined"])
+      • batcher:   a batching.AdaptiveBatcher to size batches from the
+                   interval, window length and the latency/bytes of earlier
+                   batches within a memory budget, instead of 200 tickers
+      • sessions:  with prepost minute bars, also return pre / regular / post
+                   columns (engine.SESSION_COLUMNS: PC (%), Vol, RVol per
+                   session) computed from the same download before the
+                   market-hours filter drops the extended bars; ignored for
+                   daily-only windows
+      • daily_store: a daily_store.DailyStore; daily-only windows it covers
+                   (every ticker updated through `end`, with 90 days of
+                   history before `start`) are read from it without
+                   downloading anything, other runs ignore it
+    """
+    passed = []   # daily-only rows
+    tables = []   # intraday per-batch result tables
+    for rows in _screen_batches(tickers, interval, start, end, prepost, cache, provider, scheduler, profile, compact,
+                                workers, checkpoint, batcher, sessions, daily_store):
+        if isinstance(rows, pd.DataFrame):
+            tables.append(rows)
+        else:
+            passed.extend(rows)
 
+    if tables:
+        return pd.concat(tables, ignore_index=True)
     return pd.DataFrame(passed)
\ No newline at end of file
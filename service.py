@@ -0,0 +1,317 @@
+"""
+Shared screener service: one process owns the bar cache, the result cache and
+the computation, and every dashboard session asks it for results over local
+HTTP instead of running the screener itself.
+
+    python service.py --port 8765 --cache-dir .bar_cache
+    SCREENER_SERVICE=http://127.0.0.1:8765 streamlit run dashboard.py
+
+    POST /screen   {"tickers": [...], "interval": "1m", "start": "...", "end": "...",
+                    "prepost": true, "source": "", "sessions": false}   → Parquet table
+    POST /grid     {"tickers": [...], "end": "...", "windows": [...], "source": ""}
+    GET  /stats    counters as JSON
+
+`source` is '' (yfinance) or one of the offline bar directories the service
+was started with (--bars-root); anything else, tickers that aren't plain
+symbols and grid windows window_grid.parse_window doesn't know get a 400.
+
+Identical requests (same tickers, window, bar source and output mode, see
+table_view.result_key) are computed once: a finished one is served from the
+ResultCache, one still running is joined and every caller gets its result.
+All runs share one BarCache and one FetchScheduler, so the provider's rate
+limit holds across sessions; with --daily-store, daily-only windows the
+nightly store covers are read from it. The X-Screener-Status response header says
+whether a result was "computed", "joined" or "cached".
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from cache import BarCache, check_tickers
+from daily_store import DailyStore
+from providers import LocalProvider, YFinanceProvider
+from scheduler import FetchScheduler
+from screener import run_screener
+from table_view import ResultCache, result_key
+from window_grid import run_window_grid, parse_window, DEFAULT_WINDOWS
+
+PARQUET = "application/vnd.apache.parquet"
+
+
+class _Pending:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ScreenerService:
+    """
+    The warm state behind the HTTP server; usable in-process too.
+
+      • cache_dir:   on-disk BarCache for yfinance runs ('' to disable)
+      • max_runs:    distinct runs computed at once; more wait their turn
+      • max_entries / open_ttl: the ResultCache's size and how long a window
+                     that ends today stays cached
+      • daily_store: path of a daily_store.DailyStore for yfinance daily-only
+                     runs ('' for none)
+      • bars_roots:  the only directories a run may read offline bars from
+                     (source=...); none = yfinance only
+    """
+
+    def __init__(self, cache_dir=".bar_cache", rate=4.0, max_runs=2, max_entries=32, open_ttl=60.0, daily_store="",
+                 bars_roots=()):
+        self.cache = BarCache(cache_dir) if cache_dir else None
+        self.daily_store = DailyStore(daily_store) if daily_store else None
+        self.bars_roots = {os.path.realpath(r) for r in bars_roots}
+        self.scheduler = FetchScheduler(rate=rate)
+        self.results = ResultCache(max_entries, open_ttl)
+        self._providers = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_runs))
+        self.counts = {"requests": 0, "computed": 0, "joined": 0, "cached": 0, "failed": 0}
+
+    def check_source(self, source) -> str:
+        """
+        `source` if it's '' or one of bars_roots, else ValueError.
+        """
+        if source and os.path.realpath(source) not in self.bars_roots:
+            raise ValueError(f"bar source {source!r} is not one of the service's --bars-root directories")
+        return source
+
+    def _provider(self, source):
+        self.check_source(source)
+        with self._lock:
+            if source not in self._providers:
+                self._providers[source] = LocalProvider(source) if source else YFinanceProvider()
+            return self._providers[source]
+
+    def _count(self, what):
+        with self._lock:
+            self.counts[what] += 1
+
+    # ─── RUNS ────────────────────────────────────────────────────────────────
+    def screen(self, tickers, interval, start, end, prepost=True, source="", compact=False, sessions=False) -> tuple:
+        """
+        run_screener's table for this window, as (df, status).
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        key = result_key(tickers, interval + (":sessions" if sessions else "") + (":compact" if compact else ""),
+                         start, end, prepost,
+                         self.daily_store.source(tickers, start, end, source) if self.daily_store else source)
+        return self._run(key, end, lambda: run_screener(
+            tickers, interval, start, end, (end - start).days, prepost,
+            cache=None if source else self.cache, provider=self._provider(source),
+            scheduler=self.scheduler, compact=compact, sessions=sessions,
+            daily_store=None if source else self.daily_store))
+
+    def grid(self, tickers, end, windows=DEFAULT_WINDOWS, source="") -> tuple:
+        """
+        run_window_grid's table for windows ending at `end`, as (df, status).
+        """
+        end = pd.Timestamp(end)
+        windows = list(windows)
+        key = result_key(tickers, "grid:" + ",".join(windows), end, end, False, source)
+        return self._run(key, end, lambda: run_window_grid(
+            tickers, end, windows, cache=None if source else self.cache,
+            provider=self._provider(source), scheduler=self.scheduler))
+
+    def _run(self, key, end, compute):
+        self._count("requests")
+        with self._lock:
+            ranked = self.results.get(key)
+            pending = self._inflight.get(key) if ranked is None else None
+            owner = ranked is None and pending is None
+            if owner:
+                pending = self._inflight[key] = _Pending()
+        if ranked is not None:
+            self._count("cached")
+            return ranked.raw, "cached"
+        if not owner:
+            # the same run is already being computed for another session
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            self._count("joined")
+            return pending.result, "joined"
+
+        try:
+            with self._slots:
+                df = compute()
+            self.results.put(key, df, still_open=end.date() >= date.today())
+            pending.result = df
+        except Exception as exc:
+            pending.error = exc
+            self._count("failed")
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            pending.done.set()
+        self._count("computed")
+        return df, "computed"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counts, in_flight=len(self._inflight))
+
+
+# ─── HTTP ────────────────────────────────────────────────────────────────────
+def _request_args(kind, body, service) -> dict:
+    """
+    Validated keyword arguments for service.screen / .grid.
+    """
+    tickers = body.get("tickers")
+    if not isinstance(tickers, list) or not tickers or not all(isinstance(t, str) for t in tickers):
+        raise ValueError("'tickers' must be a non-empty list of strings")
+    args = {"tickers": check_tickers(tickers), "end": pd.Timestamp(body["end"]),
+            "source": service.check_source(str(body.get("source", "")))}
+    if kind == "grid":
+        windows = body.get("windows") or list(DEFAULT_WINDOWS)
+        if not isinstance(windows, list) or not all(isinstance(w, str) for w in windows):
+            raise ValueError("'windows' must be a list of strings")
+        for w in windows:
+            parse_window(w)
+        args["windows"] = windows
+        return args
+    args.update(interval=str(body["interval"]), start=pd.Timestamp(body["start"]),
+                prepost=bool(body.get("prepost", True)), compact=bool(body.get("compact", False)),
+                sessions=bool(body.get("sessions", False)))
+    return args
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "ScreenerService/1"
+
+    def _send(self, code, body, content_type="application/json", status=None):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status:
+            self.send_header("X-Screener-Status", status)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, code, message):
+        self._send(code, json.dumps({"error": message}).encode())
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send(200, json.dumps(self.server.service.stats()).encode())
+        else:
+            self._error(404, f"unknown path {self.path}")
+
+    def do_POST(self):
+        kind = self.path.strip("/")
+        if kind not in ("screen", "grid"):
+            return self._error(404, f"unknown path {self.path}")
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            args = _request_args(kind, body, self.server.service)
+        except (KeyError, TypeError, ValueError) as exc:
+            return self._error(400, f"bad request: {exc}")
+        try:
+            df, status = getattr(self.server.service, kind)(**args)
+        except Exception as exc:
+            return self._error(500, f"{type(exc).__name__}: {exc}")
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        self._send(200, buf.getvalue(), PARQUET, status)
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+
+def make_server(service, host="127.0.0.1", port=8765, verbose=False) -> ThreadingHTTPServer:
+    """
+    An HTTP server for `service` (port=0 picks a free port; see server_address).
+    Run it with serve_forever(), in a thread for tests.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+class ScreenerClient:
+    """
+    What a dashboard session uses to talk to the service.
+
+        client = ScreenerClient("http://127.0.0.1:8765")
+        df, status = client.screen(tickers, "1m", start, end)
+    """
+
+    def __init__(self, url, timeout=3600):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, kind, payload) -> tuple:
+        req = urllib.request.Request(f"{self.url}/{kind}", data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return pd.read_parquet(io.BytesIO(resp.read())), resp.headers.get("X-Screener-Status", "")
+        except urllib.error.HTTPError as exc:
+            try:
+                message = json.loads(exc.read()).get("error", str(exc))
+            except ValueError:
+                message = str(exc)
+            raise RuntimeError(f"screener service: {message}") from None
+
+    def screen(self, tickers, interval, start, end, prepost=True, source="", compact=False, sessions=False) -> tuple:
+        return self._post("screen", {"tickers": list(tickers), "interval": interval, "start": str(start),
+                                     "end": str(end), "prepost": bool(prepost), "source": source,
+                                     "compact": bool(compact), "sessions": bool(sessions)})
+
+    def grid(self, tickers, end, windows=DEFAULT_WINDOWS, source="") -> tuple:
+        return self._post("grid", {"tickers": list(tickers), "end": str(end), "windows": list(windows),
+                                   "source": source})
+
+    def stats(self) -> dict:
+        with urllib.request.urlopen(f"{self.url}/stats", timeout=10) as resp:
+            return json.loads(resp.read())
+
+
+def main(argv=None) -> int:
+    parse = argparse.ArgumentParser(description="Shared screener service for dashboard sessions")
+    parse.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parse.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parse.add_argument("--cache-dir", default=".bar_cache", help="On-disk bar cache ('' to disable)")
+    parse.add_argument("--rate", type=float, default=4.0, help="Provider requests per second, across all runs")
+    parse.add_argument("--max-runs", type=int, default=2, help="Distinct runs computed at once")
+    parse.add_argument("--max-entries", type=int, default=32, help="Finished results kept in memory")
+    parse.add_argument("--daily-store", default="", help="SQLite store from daily_store.py for daily-only runs")
+    parse.add_argument("--bars-root", action="append", default=[],
+                       help="Offline bar directory clients may use as source (repeatable; default none)")
+    parse.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parse.parse_args(argv)
+
+    service = ScreenerService(args.cache_dir, args.rate, args.max_runs, args.max_entries, daily_store=args.daily_store,
+                              bars_roots=args.bars_root)
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"[service] listening on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
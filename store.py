@@ -0,0 +1,197 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+FIELDS = ("Open", "High", "Low", "Close", "Adj Close", "Volume")
+
+
+def _file(field):
+    return field.lower().replace(" ", "_") + ".npy"
+
+
+def _per_ticker(bars, tz):
+    """
+    {ticker: frame} from a wide (ticker, field) frame or a dict, each sorted,
+    de-duplicated and indexed by naive exchange-local time.
+    """
+    if isinstance(bars, pd.DataFrame):
+        if bars.empty or not isinstance(bars.columns, pd.MultiIndex):
+            return {}
+        bars = {t: bars[t] for t in bars.columns.get_level_values(0).unique()}
+    out = {}
+    for t, df in bars.items():
+        if df is None or df.empty:
+            continue
+        df = df.dropna(how="all")
+        idx = pd.DatetimeIndex(df.index)
+        if idx.tz is not None:
+            idx = idx.tz_convert(tz).tz_localize(None)
+        df = df.set_axis(idx.as_unit("ns"), axis=0).sort_index()
+        out[t] = df[~df.index.duplicated(keep="last")]
+    return out
+
+
+class BarStore:
+    """
+    Memory-mapped columnar bars for a whole universe at one interval.
+
+        root/<interval>/meta.json      tickers, tz, fields
+                       offsets.npy     int64, ticker j is rows [offsets[j], offsets[j+1])
+                       stamps.npy      int64 ns, naive exchange-local time, sorted per ticker
+                       close.npy ...   float64, one file per field
+
+    Every array is opened with np.load(mmap_mode="r"): opening is a json read,
+    bars are paged in on first touch, and every process that opens the same
+    store shares one page-cached copy. store[ticker] is a DataFrame whose
+    columns and index are views into those maps, so slice_window(store, ...),
+    compute_metrics and the filters/ screeners run on it without copying.
+    The store also looks like a {ticker: frame} mapping (frames(), keys()) and
+    hands WindowIndex / compute_metrics_many its arrays directly (segments()).
+
+    Stamps are naive wall-clock time in `tz` (like export.csv and
+    LocalProvider) since a tz-aware index can't be a view of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as fh:
+            self.meta = json.load(fh)
+        self.tickers = list(self.meta["tickers"])
+        self.ids = {t: j for j, t in enumerate(self.tickers)}
+        self.tz = self.meta.get("tz", "")
+        self.fields = list(self.meta["fields"])
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.stamps = np.load(os.path.join(path, "stamps.npy"), mmap_mode="r")
+        self.arrays = {f: np.load(os.path.join(path, _file(f)), mmap_mode="r") for f in self.fields}
+        self._columns = pd.Index(self.tickers)
+
+    # ─── OPEN / WRITE ────────────────────────────────────────────────────────
+    @classmethod
+    def open(cls, root, interval="1m") -> "BarStore":
+        return cls(os.path.join(root, interval))
+
+    @classmethod
+    def write(cls, root, bars, interval="1m", tz="America/New_York") -> "BarStore":
+        """
+        (Re)write the store for `interval` from a wide frame or {ticker: frame}.
+        The new files are built next to the old store and swapped in, so
+        readers never see a half-written one.
+        """
+        frames = _per_ticker(bars, tz)
+        tickers = sorted(frames)
+        fields = [f for f in FIELDS if any(f in frames[t].columns for t in tickers)]
+        lens = np.array([len(frames[t]) for t in tickers], dtype="int64")
+        offsets = np.concatenate([[0], np.cumsum(lens)]).astype("int64")
+
+        final = os.path.join(root, interval)
+        tmp = f"{final}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+        # fill each file through its own map, one ticker at a time, so no
+        # full-universe copy of the bars is built in RAM
+        stamps = np.lib.format.open_memmap(os.path.join(tmp, "stamps.npy"), "w+", "int64", (int(offsets[-1]),))
+        outs = {f: np.lib.format.open_memmap(os.path.join(tmp, _file(f)), "w+", "float64", (int(offsets[-1]),))
+                for f in fields}
+        for j, t in enumerate(tickers):
+            a, b = offsets[j], offsets[j + 1]
+            df = frames[t]
+            stamps[a:b] = df.index.asi8
+            for f, arr in outs.items():
+                arr[a:b] = df[f].to_numpy("float64") if f in df.columns else np.nan
+        for arr in [stamps, *outs.values()]:
+            arr.flush()
+        del stamps, outs
+        with open(os.path.join(tmp, "meta.json"), "w") as fh:
+            json.dump({"tickers": tickers, "tz": tz, "fields": fields, "interval": interval}, fh)
+
+        old = f"{final}.old-{os.getpid()}"
+        if os.path.exists(final):
+            os.replace(final, old)
+        os.replace(tmp, final)
+        shutil.rmtree(old, ignore_errors=True)
+        return cls(final)
+
+    @classmethod
+    def merge(cls, root, bars, interval="1m", tz="America/New_York") -> "BarStore":
+        """
+        write() with the bars already in the store kept; new bars win on the same stamp.
+        """
+        path = os.path.join(root, interval)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return cls.write(root, bars, interval, tz)
+        old = cls(path)
+        frames = {t: old[t] for t in old.tickers}
+        for t, df in _per_ticker(bars, old.tz or tz).items():
+            frames[t] = pd.concat([frames[t], df]) if t in frames else df
+        return cls.write(root, frames, interval, old.tz or tz)
+
+    # ─── MAPPING-LIKE ACCESS ─────────────────────────────────────────────────
+    @property
+    def empty(self) -> bool:
+        return not self.tickers
+
+    @property
+    def columns(self) -> pd.Index:
+        # tickers, so `ticker in store.columns` works like on a wide yf frame
+        return self._columns
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self.ids
+
+    def keys(self):
+        return list(self.tickers)
+
+    def _rows(self, ticker):
+        j = self.ids[ticker]
+        return int(self.offsets[j]), int(self.offsets[j + 1])
+
+    def index(self, ticker) -> pd.DatetimeIndex:
+        a, b = self._rows(ticker)
+        return pd.DatetimeIndex(self.stamps[a:b].view("datetime64[ns]"), copy=False)
+
+    def __getitem__(self, ticker) -> pd.DataFrame:
+        """
+        One ticker's bars as a DataFrame of views into the maps (read-only).
+        """
+        a, b = self._rows(ticker)
+        return pd.DataFrame({f: self.arrays[f][a:b] for f in self.fields}, index=self.index(ticker), copy=False)
+
+    def window(self, ticker, start=None, end=None) -> pd.DataFrame:
+        """
+        store[ticker] restricted to start <= stamp <= end by binary search.
+        """
+        df = self[ticker]
+        lo = 0 if start is None else df.index.searchsorted(pd.Timestamp(start), "left")
+        hi = len(df) if end is None else df.index.searchsorted(pd.Timestamp(end), "right")
+        return df.iloc[lo:max(hi, lo)]
+
+    def frames(self, tickers=None, start=None, end=None) -> dict:
+        tickers = self.tickers if tickers is None else [t for t in tickers if t in self.ids]
+        return {t: self.window(t, start, end) for t in tickers}
+
+    def values(self):
+        return (self[t] for t in self.tickers)
+
+    def segments(self):
+        """
+        The _segments layout WindowIndex and compute_metrics_many work from,
+        straight from the maps.
+        """
+        offsets = np.asarray(self.offsets)
+        return (list(self.tickers), self.arrays["Close"], self.arrays["Volume"],
+                self.stamps.view("datetime64[ns]"), offsets[:-1], offsets[1:])
+
+    def file(self, field) -> str:
+        """
+        Path of one field's .npy ("stamps" for the index), for processes that map it themselves.
+        """
+        return os.path.join(self.path, "stamps.npy" if field == "stamps" else _file(field))
+
+    def nbytes(self) -> int:
+        return self.stamps.nbytes + self.offsets.nbytes + sum(a.nbytes for a in self.arrays.values())
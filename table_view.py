@@ -0,0 +1,232 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from millify import millify as mf
+
+VOLUME_COLUMNS = [
+    "Min Total Vol","Avg Vol/Min","RVol (min)",
+    "Day Total Vol","Avg Vol/Day","RVol (day)",
+    "Total Volume","Average Volume","Relative Volume",
+]
+
+def result_schema(raw: pd.DataFrame) -> dict:
+    """
+    Detect schema (daily, intraday or a window_grid table) of a screener
+    result and the column labels the dashboard filters and ranks on. Grid
+    results filter on their first window and rank on any window's columns.
+    """
+    grid = [c[len("PC (%) "):] for c in raw.columns if c.startswith("PC (%) ")]
+    if grid:
+        w = grid[0]
+        return {
+            "is_daily":     False,
+            "is_grid":      True,
+            "pc_col":       f"PC (%) {w}",
+            "vol_col":      f"Total Vol {w}",
+            "avg_col":      f"Avg Vol {w}",
+            "rvol_col":     f"RVol {w}",
+            "rvol_day_col": None,
+            "rank_choices": ([f"PC (%) {g}" for g in grid] + [f"RVol {g}" for g in grid]
+                             + [f"Avg Vol {g}" for g in grid] + [f"Total Vol {g}" for g in grid]),
+        }
+    is_daily = "Total Volume" in raw.columns
+    vol_col  = "Total Volume"   if is_daily else "Min Total Vol"
+    avg_col  = "Average Volume" if is_daily else "Avg Vol/Min"
+    rvol_col = "Relative Volume" if is_daily else "RVol (min)"
+    rank_choices = (["PC (%)", rvol_col, avg_col, vol_col]
+                    if is_daily else ["PC (%)","RVol (day)","RVol (min)","Avg Vol/Min","Min Total Vol"])
+    # run_screener(sessions=True) adds Pre/Reg/Post PC (%), Vol and RVol
+    rank_choices += [c for c in raw.columns if c.startswith(("Pre ", "Reg ", "Post "))]
+    return {
+        "is_daily":     is_daily,
+        "is_grid":      False,
+        "pc_col":       "PC (%)",
+        "vol_col":      vol_col,
+        "avg_col":      avg_col,
+        "rvol_col":     rvol_col,
+        "rvol_day_col": None if is_daily else "RVol (day)",
+        "rank_choices": rank_choices,
+    }
+
+def apply_filters(raw, pc_rng, min_vol, min_avg, min_rv, min_rv_day, metric, top_n) -> pd.DataFrame:
+    """
+    The dashboard's "Apply filters" step: threshold masks, then top N by `metric`.
+    min_rv_day is ignored for daily and grid results.
+    """
+    schema = result_schema(raw)
+    f = raw.copy()
+    f = f[
+        (f[schema["pc_col"]].between(pc_rng[0], pc_rng[1])) &
+        (f[schema["vol_col"]] >= min_vol) &
+        (f[schema["avg_col"]] >= min_avg) &
+        (f[schema["rvol_col"]] >= min_rv)
+    ]
+    if schema["rvol_day_col"]:
+        f = f[f[schema["rvol_day_col"]] >= min_rv_day]
+    return f.sort_values(metric, ascending=False, kind="stable").head(top_n)
+
+
+class RankedResults:
+    """
+    One result set with everything "Apply filters" needs precomputed:
+
+      • the filter columns as plain float arrays
+      • a descending sort order per rank choice (stable, NaN last)
+
+    filter() then is a few vectorized compares plus a walk down the chosen
+    order, with no copy or re-sort of the frame, so threshold and top-N
+    changes stay instant on 5,000-row results. Same rows, same order as
+    apply_filters.
+    """
+
+    def __init__(self, raw: pd.DataFrame):
+        self.raw = raw
+        self.schema = result_schema(raw)
+        cols = [self.schema["pc_col"], self.schema["vol_col"], self.schema["avg_col"], self.schema["rvol_col"]]
+        if self.schema["rvol_day_col"]:
+            cols.append(self.schema["rvol_day_col"])
+        self._cols = {c: pd.to_numeric(raw[c], errors="coerce").to_numpy("float64") for c in cols if c in raw.columns}
+        self.orders = {}
+        for metric in self.schema["rank_choices"]:
+            if metric in raw.columns:
+                self.orders[metric] = raw[metric].reset_index(drop=True).sort_values(
+                    ascending=False, kind="stable").index.to_numpy()
+
+    def mask(self, pc_rng, min_vol, min_avg, min_rv, min_rv_day=None) -> np.ndarray:
+        c, schema = self._cols, self.schema
+        pc = c[schema["pc_col"]]
+        m = (pc >= pc_rng[0]) & (pc <= pc_rng[1])
+        m &= c[schema["vol_col"]] >= min_vol
+        m &= c[schema["avg_col"]] >= min_avg
+        m &= c[schema["rvol_col"]] >= min_rv
+        if schema["rvol_day_col"]:
+            m &= c[schema["rvol_day_col"]] >= min_rv_day
+        return m
+
+    def filter(self, pc_rng, min_vol, min_avg, min_rv, min_rv_day, metric, top_n) -> pd.DataFrame:
+        """
+        apply_filters() from the precomputed arrays and sort orders.
+        """
+        order = self.orders[metric]
+        keep = order[self.mask(pc_rng, min_vol, min_avg, min_rv, min_rv_day)[order]]
+        return self.raw.iloc[keep[:max(int(top_n), 0)]]
+
+
+def result_key(tickers, interval, start, end, prepost, source="") -> tuple:
+    """
+    Cache key for one screener run; the ticker list goes in as a hash.
+    """
+    digest = hashlib.sha1("\n".join(tickers).encode()).hexdigest()
+    return (digest, interval, str(start), str(end), bool(prepost), source)
+
+
+class ResultCache:
+    """
+    Screener results kept across dashboard reruns and sessions, LRU by key.
+
+    Windows that are already over never change, so they stay until evicted;
+    a window ending today is still filling in and expires after open_ttl
+    seconds. Each entry keeps its RankedResults so filtering a cached run
+    doesn't rebuild the sort orders either.
+    """
+
+    def __init__(self, max_entries=32, open_ttl=60.0):
+        self.max_entries = max_entries
+        self.open_ttl = open_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            ranked, expires = hit
+            if expires is not None and time.monotonic() > expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return ranked
+
+    def put(self, key, raw: pd.DataFrame, still_open=False) -> RankedResults:
+        ranked = RankedResults(raw)
+        expires = time.monotonic() + self.open_ttl if still_open else None
+        with self._lock:
+            self._entries[key] = (ranked, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return ranked
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+PAGE_SIZE = 100  # rows sent to the browser per results page
+
+
+def column_formats(display_df: pd.DataFrame) -> dict:
+    """
+    printf-style / named number formats per column for st.column_config,
+    matching style_results: 2-dp prices, signed PC (%), compact ("1.2M")
+    volumes, 2-dp RVol. The browser formats whole columns from these, so the
+    frame itself stays numeric and sortable.
+    """
+    formats = {}
+    for col in display_df.columns:
+        if col == "Price":
+            formats[col] = "%.2f"
+        elif col.startswith("PC (%)") or col.endswith(" PC (%)"):
+            formats[col] = "%+.2f%%"
+        elif col in VOLUME_COLUMNS or col.startswith(("Total Vol ", "Avg Vol ")):
+            formats[col] = "%.2f" if "RVol" in col or "Relative" in col else "compact"
+        elif col.startswith("RVol ") or col.endswith(" RVol"):
+            formats[col] = "%.2f"
+        elif col.endswith(" Vol"):
+            formats[col] = "compact"
+    return formats
+
+
+def result_page(display_df: pd.DataFrame, page=1, page_size=PAGE_SIZE) -> tuple:
+    """
+    Rows of 1-based `page` (clamped) plus the page count, as a positional
+    view — only this slice goes to st.dataframe.
+    """
+    n_pages = max(1, -(-len(display_df) // page_size))
+    page = min(max(int(page), 1), n_pages)
+    return display_df.iloc[(page - 1) * page_size: page * page_size], n_pages
+
+
+def _mill(x):
+    try:
+        # pd.isna handles None/NaN safely
+        return "" if pd.isna(x) else mf(x, precision=2)
+    except Exception:
+        return x
+
+def color_change(val):
+    if isinstance(val, (int, float)):
+        return "color: green" if val > 0 else ("color: red" if val < 0 else "color: grey")
+    return "color: grey"
+
+def style_results(display_df: pd.DataFrame):
+    """
+    Styler for the results table: millified volumes, PC (%) with a sign colour.
+    """
+    # formatters that only attach to columns that exist (daily, intraday or grid)
+    formatters = {"Price": "{:,.2f}"}
+    pc_cols = [c for c in display_df.columns if c.startswith("PC (%)")]
+    for col in pc_cols:
+        formatters[col] = lambda x: f"{x:.2f}%"
+
+    for col in display_df.columns:
+        if col in VOLUME_COLUMNS or col.startswith(("Total Vol ", "Avg Vol ")):
+            formatters[col] = _mill
+
+    styler = display_df.style.format(formatters)
+    if pc_cols:
+        styler = styler.map(color_change, subset=pc_cols)
+    return styler
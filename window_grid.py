@@ -0,0 +1,169 @@
+import re
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from providers import YFinanceProvider, session_codes
+from scheduler import FetchScheduler
+from screener import _download, baseline_vector
+from window_index import WindowIndex
+from planner import FetchPlan
+
+DEFAULT_WINDOWS = ("15m", "1h", "today", "5d", "20d")
+BASELINE_DAYS = 90
+
+
+def parse_window(spec: str) -> tuple:
+    """
+    "15m" / "1h" → ("min", minutes), "today" → ("today", None),
+    "5d" → ("day", sessions).
+    """
+    spec = spec.strip().lower()
+    if spec == "today":
+        return "today", None
+    m = re.fullmatch(r"(\d+)\s*(m|min|h|d)", spec)
+    if not m or int(m.group(1)) <= 0:
+        raise ValueError(f"Unknown window '{spec}' (use e.g. 15m, 1h, today, 5d)")
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == "d":
+        return "day", n
+    return "min", n * 60 if unit == "h" else n
+
+
+def grid_columns(window: str) -> list:
+    return [f"PC (%) {window}", f"Total Vol {window}", f"Avg Vol {window}", f"RVol {window}"]
+
+
+def _bar_minutes(interval):
+    return float(interval.rstrip("m"))
+
+
+def _last_close(wide, syms) -> pd.Series:
+    """
+    Last non-NaN close per ticker of a wide (ticker, field) frame.
+    """
+    if wide.empty or not isinstance(wide.columns, pd.MultiIndex):
+        return pd.Series(np.nan, index=syms)
+    close = wide.xs("Close", axis=1, level=1).reindex(columns=syms)
+    return close.ffill().iloc[-1]
+
+
+def _window_table(index, windows, bounds, baseline, syms):
+    """
+    Metrics of every window in `windows` from one WindowIndex, as grid columns.
+    """
+    out = {}
+    for w in windows:
+        s, e = bounds[w]
+        m = index.metrics(s, e, baseline).reindex(syms, fill_value=0)
+        for col, src in zip(grid_columns(w), ["pct_change", "total_vol", "avg_vol", "rel_vol"]):
+            out[col] = m[src].to_numpy()
+    return out
+
+
+def run_window_grid(tickers, end, windows=DEFAULT_WINDOWS, interval="1m", prepost=False,
+                    cache=None, provider=None, scheduler=None) -> pd.DataFrame:
+    """
+    Screen `tickers` over several lookback windows ending at `end` at once.
+
+      • "15m", "1h", ...: the minute bars of the N minutes before `end`
+                          (`end` itself excluded, as in the download)
+      • "today":          `end`'s session so far (from 04:00 with prepost)
+      • "5d", "20d", ...: the last N daily bars up to `end`'s date, with
+                          run_screener's daily-window numbers (change from
+                          the close before the window, first day's volume
+                          left out)
+
+    Per batch of 200 there is one minute-bar download covering the widest
+    intraday window; the daily bars covering the widest day window plus the
+    90-day baseline are one planned download for all batches (planner.FetchPlan). Each is indexed once (window_index.WindowIndex)
+    and every window is then a binary search and prefix-sum differences over
+    the same arrays. Returns one row per ticker: Ticker, Price and PC (%),
+    Total Vol, Avg Vol and RVol per window, in `windows` order (see
+    grid_columns). RVol compares to the 90-day average daily volume before
+    `end`'s date.
+    """
+    provider  = provider or YFinanceProvider()
+    scheduler = scheduler or FetchScheduler()
+    end = pd.Timestamp(end)
+    windows = list(windows)
+    specs = {w: parse_window(w) for w in windows}
+    minute_w = [w for w in windows if specs[w][0] != "day"]
+    day_w    = [w for w in windows if specs[w][0] == "day"]
+
+    # ─── WINDOW BOUNDS (naive exchange-local, [start, end)) ─────────────────
+    # the minute download stops before `end`, so the windows do too: the last
+    # bar counted is the last one stamped before `end`, and a 15m window at 1m
+    # holds 15 bars
+    last = end - pd.Timedelta(1, "ns")
+    session_start = end.normalize() + (timedelta(hours=4) if prepost else timedelta(hours=9, minutes=30))
+    min_bounds = {}
+    for w in minute_w:
+        kind, n = specs[w]
+        min_bounds[w] = (session_start, last) if kind == "today" else (end - timedelta(minutes=n), last)
+    min_start = min((s for s, _ in min_bounds.values()), default=None)
+    longest = max((specs[w][1] for w in day_w), default=0)
+    day_start = (end.normalize() - timedelta(days=BASELINE_DAYS + 2 * longest)).date()
+    day_end = (end.normalize() + timedelta(days=1)).date()
+
+    # every batch needs the same daily range: one planned request for all of them
+    batches = list(enumerate(tickers[i:i + 200] for i in range(0, len(tickers), 200)))
+    plan = FetchPlan()
+    for n, batch in batches:
+        plan.need(n, batch, day_start, day_end, "1d", False)
+    plan.fetch(lambda *req: _download(provider, *req, cache, scheduler), scheduler)
+
+    def fetch_batch(numbered):
+        n, batch = numbered
+        bars = {"day": plan.get(n)}
+        if minute_w:
+            bars["min"] = _download(provider, batch, min_start, end, interval, prepost, cache, scheduler)
+        return bars
+
+    tables = []
+    for (n, batch), bars in scheduler.run(batches, fetch_batch):
+        syms = [t.replace("-", ".") for t in batch]
+        df_day = bars["day"]
+        if hasattr(df_day.index, "tz") and df_day.index.tz is not None:
+            df_day.index = df_day.index.tz_localize(None)
+        df_day = df_day[df_day.index.normalize() <= end.normalize()] if not df_day.empty else df_day
+
+        # 90 days before end's date, the same lookback run_screener uses
+        lb = df_day[(df_day.index < end.normalize())
+                    & (df_day.index >= end.normalize() - timedelta(days=BASELINE_DAYS))] if not df_day.empty else df_day
+        baseline = baseline_vector(lb, syms)
+        cols = {"Ticker": syms}
+        price = pd.Series(np.nan, index=syms)
+
+        if day_w:
+            index = WindowIndex(df_day, bar_minutes=None) if not df_day.empty else None
+            stamps = df_day.index
+            bounds = {}
+            for w in day_w:
+                # N sessions of change need the close before them: N+1 bars
+                k = min(specs[w][1] + 1, len(stamps))
+                bounds[w] = (stamps[-k], None) if k else (None, None)
+            if index is not None and len(index):
+                cols.update(_window_table(index, day_w, bounds, baseline, syms))
+                price = _last_close(df_day, syms)
+            else:
+                cols.update({c: np.zeros(len(syms)) for w in day_w for c in grid_columns(w)})
+
+        if minute_w:
+            df_min = bars["min"]
+            if not df_min.empty and not prepost:
+                df_min = df_min[session_codes(df_min.index) == 1]
+            if not df_min.empty:
+                index = WindowIndex(df_min, bar_minutes=_bar_minutes(interval))
+                cols.update(_window_table(index, minute_w, min_bounds, baseline, syms))
+                price = _last_close(df_min, syms).fillna(price)
+            else:
+                cols.update({c: np.zeros(len(syms)) for w in minute_w for c in grid_columns(w)})
+
+        cols["Price"] = price.round(2).to_numpy()
+        tables.append(pd.DataFrame(cols, columns=["Ticker", "Price"] + [c for w in windows for c in grid_columns(w)]))
+        bars.clear()
+        plan.release(n)
+
+    if not tables:
+        return pd.DataFrame(columns=["Ticker", "Price"] + [c for w in windows for c in grid_columns(w)])
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+
+def _wall(index) -> np.ndarray:
+    """
+    Exchange-local wall-clock stamps as datetime64, whatever the index tz.
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.to_numpy()
+
+def _segments(slices):
+    """
+    Flatten {ticker: slice} or a wide (ticker, field) frame into one Close
+    array, one Volume array, one index array and per-ticker [start, end) offsets.
+    A BarStore is already laid out that way and hands over its maps.
+    """
+    if hasattr(slices, "segments"):
+        return slices.segments()
+    if isinstance(slices, pd.DataFrame):
+        tickers = list(slices.columns.get_level_values(0).unique()) if not slices.empty else []
+        n_rows = len(slices)
+        close = slices.xs("Close", axis=1, level=1).reindex(columns=tickers).to_numpy("float64").T.ravel()
+        vol   = slices.xs("Volume", axis=1, level=1).reindex(columns=tickers).to_numpy("float64").T.ravel()
+        idx   = np.tile(_wall(slices.index), len(tickers))
+        lens  = np.full(len(tickers), n_rows)
+    else:
+        tickers = list(slices.keys())
+        frames  = [slices[t] for t in tickers]
+        lens    = np.array([len(f) for f in frames], dtype="int64")
+        live    = [f for f in frames if len(f)]
+        close = np.concatenate([f["Close"].to_numpy("float64") for f in live]) if live else np.empty(0)
+        vol   = np.concatenate([f["Volume"].to_numpy("float64") for f in live]) if live else np.empty(0)
+        idx   = np.concatenate([_wall(f.index) for f in live]) if live else np.empty(0, "datetime64[ns]")
+    ends = np.cumsum(lens)
+    return tickers, close, vol, idx, ends - lens, ends
+
+def _bar_minutes(slices):
+    """
+    Bar size in minutes from the first slice with 2+ bars, or None for daily bars.
+    """
+    frames = [slices] if isinstance(slices, pd.DataFrame) else slices.values()
+    for f in frames:
+        if len(f) > 1:
+            delta = f.index.to_series().diff().dropna().min()
+            return delta.total_seconds() / 60 if delta < pd.Timedelta("1D") else None
+    return None
+
+
+class WindowIndex:
+    """
+    Per-ticker time index over loaded bars for repeated [start, end] queries.
+
+    Built once from {ticker: frame} or a wide yf-style (ticker, field) frame:
+      • stamps:  each ticker's sorted wall-clock timestamps, back to back
+      • close:   closes in the same order, for positional first/last lookups
+      • csum:    running volume (NaN as 0), and for intraday bars a running
+                 count of non-midnight bars, each with a leading 0
+
+    A window is then two binary searches per ticker (one for all tickers when
+    they share an index, as in a wide frame) and its total volume, average
+    volume and percent change are prefix-sum differences — no mask over the
+    bars and no copies, however often the same data is re-sliced.
+    """
+
+    def __init__(self, slices, bar_minutes="auto"):
+        tickers, close, vol, idx, starts, ends = _segments(slices)
+        self.tickers = tickers
+        self.bar_minutes = _bar_minutes(slices) if bar_minutes == "auto" else bar_minutes
+        self.close = close
+        self.stamps = idx.astype("datetime64[ns]").view("int64")
+        self.starts, self.ends = starts, ends
+        # a wide frame has one index for everyone: search it once, not per ticker
+        self._shared = self.stamps[:ends[0]] if isinstance(slices, pd.DataFrame) and len(tickers) else None
+
+        vol = np.nan_to_num(vol, nan=0.0)
+        self._vol = vol
+        if self.bar_minutes is not None:
+            # ➕ intraday: average across minute bars only
+            keep = (idx - idx.astype("datetime64[D]")) != np.timedelta64(0, "ns")
+            self.csum = np.concatenate([[0.0], np.cumsum(np.where(keep, vol, 0.0))])
+            self.ccnt = np.concatenate([[0], np.cumsum(keep)])
+        else:
+            self.csum = np.concatenate([[0.0], np.cumsum(vol)])
+            self.ccnt = None
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @staticmethod
+    def _ns(ts):
+        if ts is None:
+            return None
+        ts = pd.Timestamp(ts)
+        if ts.tz is not None:
+            ts = ts.tz_localize(None)
+        return ts.as_unit("ns").value
+
+    def bounds(self, start=None, end=None):
+        """
+        Per-ticker [lo, hi) positions of the bars with start <= stamp <= end
+        (wall-clock; either bound optional), like slice_window's mask.
+        """
+        s, e = self._ns(start), self._ns(end)
+        if self._shared is not None:
+            n = len(self._shared)
+            lo = 0 if s is None else int(np.searchsorted(self._shared, s, "left"))
+            hi = n if e is None else int(np.searchsorted(self._shared, e, "right"))
+            return self.starts + lo, self.starts + max(hi, lo)
+        lo, hi = self.starts.copy(), self.ends.copy()
+        for j, (a, b) in enumerate(zip(self.starts, self.ends)):
+            seg = self.stamps[a:b]
+            if s is not None:
+                lo[j] = a + np.searchsorted(seg, s, "left")
+            if e is not None:
+                hi[j] = max(a + np.searchsorted(seg, e, "right"), lo[j])
+        return lo, hi
+
+    def metrics(self, start=None, end=None, baseline=None) -> pd.DataFrame:
+        """
+        compute_metrics for every ticker over [start, end]: pct_change,
+        total_vol, avg_vol and rel_vol indexed by ticker, from the prefix sums.
+        baseline is the per-ticker baseline daily volume (see baseline_vector);
+        tickers without one fall back to their own avg_vol.
+        """
+        cols = ["pct_change", "total_vol", "avg_vol", "rel_vol"]
+        if not self.tickers:
+            return pd.DataFrame(columns=cols)
+        lo, hi = self.bounds(start, end)
+        return self._metrics(lo, hi, baseline)
+
+    def _metrics(self, lo, hi, baseline):
+        close, vol, csum = self.close, self._vol, self.csum
+        lens  = hi - lo
+        empty = lens == 0
+        first = np.minimum(lo, max(len(close) - 1, 0))
+        last  = np.maximum(hi - 1, 0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Price change: first CLOSE → last CLOSE
+            first_close = close[first] if len(close) else np.zeros(len(self.tickers))
+            last_close  = close[last] if len(close) else np.zeros(len(self.tickers))
+            pct_change  = np.where(first_close != 0, (last_close - first_close) / first_close * 100, 0.0)
+
+            # ─── VOLUME ───────────────────────────────────────────────────────
+            sums = csum[hi] - csum[lo]
+            if self.ccnt is not None:
+                total_vol = np.trunc(sums)
+                avg_vol   = sums / (self.ccnt[hi] - self.ccnt[lo])
+            else:
+                # ➕ daily window: subtract the first day’s volume
+                first_vol = np.where(empty, 0.0, vol[first] if len(vol) else 0.0)
+                multi = lens > 1
+                total_vol = np.trunc(np.where(multi, sums - first_vol, sums))
+                avg_vol   = np.where(multi, total_vol / np.maximum(lens - 1, 1), total_vol)
+
+            # ─── RELATIVE VOLUME ───────────────────────────────
+            base = pd.Series(baseline if baseline is not None else {}, dtype="float64").reindex(self.tickers).to_numpy()
+            base = np.where(np.isnan(base), avg_vol, base)
+            if self.ccnt is not None:
+                per_bar = base / (390.0 / self.bar_minutes)
+                rel_vol = np.where(per_bar != 0, avg_vol / per_bar, 0.0)
+            else:
+                rel_vol = np.where(base != 0, avg_vol / base, 0.0)
+
+        out = pd.DataFrame({
+            "pct_change": np.round(pct_change, 2),
+            "total_vol":  total_vol.astype("int64"),
+            "avg_vol":    np.round(avg_vol),
+            "rel_vol":    np.round(rel_vol, 2),
+        }, index=pd.Index(self.tickers, name="Ticker"))
+        out.loc[empty] = 0
+        if np.isfinite(out["avg_vol"]).all():
+            out["avg_vol"] = out["avg_vol"].astype("int64")
+        return out
+
+    def full(self, baseline=None) -> pd.DataFrame:
+        """
+        metrics() over every loaded bar of every ticker.
+        """
+        if not self.tickers:
+            return pd.DataFrame(columns=["pct_change", "total_vol", "avg_vol", "rel_vol"])
+        return self._metrics(self.starts, self.ends, baseline)